@@ -0,0 +1,444 @@
+# Benchmark for the crawler.
+# Crawls a synthetic web, served from local ports, with all delays scaled down. Reports pages/sec, fetch latency,
+# parse time per page and peak memory, so that changes to the main loop, robots_check and link extraction can be compared.
+#
+# Example:
+#   python benchmark.py --hosts 8 --pages 200 --visit 500 --robots mixed --latency lognormal:20:0.5 --json results.json
+
+# Structure::
+# 1. Setup
+# 1.1. Import modules
+import argparse
+import asyncio
+import http.server
+import json
+import math
+import random
+import resource
+import socket
+import sys
+import threading
+import time
+from multiprocessing import Pipe, Process
+
+from crawler import AsyncCrawlEngine, Crawler, DnsCache, HostScheduler, RulePolicy, hostOfUrl, parseScorers
+
+# 1.2. Synthetic web
+
+ROBOTS_VARIANTS = ('open', 'disallow', 'wildcard', 'missing')
+TOS_VARIANTS = ('none', 'plain', 'crawler')
+GRAPH_KINDS = ('random', 'powerlaw', 'chain')
+
+FILLER = ('Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore et dolore magna aliqua. '
+          'Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris nisi ut aliquip ex ea commodo consequat. ')
+
+def latencyProfile(spec, rng):
+    """
+    Function to turn a latency profile into a function that gives the delay (s) before each response.
+    Inputs: spec (str), one of:
+                'none'
+                'fixed:MS'                      - every response after MS milliseconds
+                'lognormal:MEDIAN_MS:SIGMA'     - lognormal delays around a median
+                'tail:MS:SLOW_MS:FRACTION'      - MS, but FRACTION of the responses take SLOW_MS
+            rng (random.Random)
+    Output: (function), no inputs, gives seconds (float)
+    """
+    kind, _, params = spec.partition(':')
+    values = [float(value) for value in params.split(':')] if params else []
+    if kind == 'none':
+        return lambda: 0.0
+    if kind == 'fixed' and len(values) == 1:
+        return lambda: values[0] / 1000
+    if kind == 'lognormal' and len(values) == 2:
+        return lambda: rng.lognormvariate(math.log(values[0] / 1000), values[1])
+    if kind == 'tail' and len(values) == 3:
+        return lambda: (values[1] if rng.random() < values[2] else values[0]) / 1000
+    raise ValueError('Unknown latency profile: %r' % (spec,))
+
+def robotsFile(variant, crawl_delay, rng):
+    """
+    Function to write the /robots.txt of a synthetic host.
+    Inputs: variant (str), one of ROBOTS_VARIANTS
+            crawl_delay (float), the Crawl-delay it declares (before the crawler scales it)
+            rng (random.Random)
+    Output: (status (int), body (str))
+    """
+    if variant == 'missing':
+        return 404, ''
+    lines = ['# Synthetic host for benchmarking', 'User-agent: *']
+    if variant == 'disallow':
+        lines += ['Disallow: /private/', 'Allow: /private/open']
+    elif variant == 'wildcard':
+        # Lots of rules, most of them with wildcards, so the matcher has some work to do.
+        lines += ['Disallow: /private/', 'Disallow: /*?sessionid=', 'Disallow: /*.pdf$', 'Allow: /*?page=']
+        lines += ['Disallow: /archive/%d/*/old$' % year for year in range(1990, 2030)]
+        lines += ['Disallow: /tag/%s*' % ''.join(rng.choice('abcdefghij') for _ in range(6)) for _ in range(40)]
+    lines.append('Crawl-delay: %g' % crawl_delay)
+    return 200, '\n'.join(lines) + '\n'
+
+def termsPage(variant):
+    """
+    Function to write the terms of service page of a synthetic host. Paragraphs are separated by blank lines.
+    Input: variant (str), 'plain' or 'crawler' (mentions crawlers, so its paragraphs go to the policy)
+    Output: (str)
+    """
+    paragraphs = ['Terms of Service', FILLER * 3, FILLER * 2]
+    if variant == 'crawler':
+        paragraphs += ['Automated crawlers and spiders must respect robots.txt and the Crawl-delay.', FILLER]
+    return '\n\n'.join(paragraphs)
+
+class SyntheticWeb():
+    """
+    A set of synthetic hosts, one per local port, with pages linked according to a graph model.
+    Pages are '/p0' .. '/pN'. Links are a mix of relative, host-relative and absolute forms, with some fragments and
+    tracking parameters, so that URL resolution does real work. The hosts are served from a separate process
+    (see start), so that it doesn't count towards the memory of the crawl.
+    """
+
+    def __init__(self, hosts = 8, pages = 100, links = 20, external = 0.2, graph = 'random', robots = 'open', tos = 'plain',
+                 latency = 'none', crawl_delay = 1.0, page_bytes = 20000, seed = 0, host_names = False):
+        if graph not in GRAPH_KINDS:
+            raise ValueError('Unknown graph: %r' % (graph,))
+        if robots not in ROBOTS_VARIANTS + ('mixed',):
+            raise ValueError('Unknown robots variant: %r' % (robots,))
+        if tos not in TOS_VARIANTS:
+            raise ValueError('Unknown ToS variant: %r' % (tos,))
+        latencyProfile(latency, random.Random())                                # Check the spec before starting the server
+        self.hosts = hosts                                                      # Number of hosts (ports)
+        self.pages = pages                                                      # Pages per host
+        self.links = links                                                      # Links per page
+        self.external = external                                                # Fraction of the links that go to other hosts
+        self.graph = graph                                                      # 'random', 'powerlaw' (few pages get most links) or 'chain'
+        self.robots = robots                                                    # A robots variant, or 'mixed' for a different one per host
+        self.tos = tos                                                          # ToS variant
+        self.latency = latency                                                  # Latency profile, see latencyProfile
+        self.crawl_delay = crawl_delay                                          # Crawl-delay the robots files declare
+        self.page_bytes = page_bytes                                            # Approximate size of each page
+        self.seed = seed
+        self.host_names = host_names                                            # Link to 'hostN.bench' names (see StubResolver) instead of 127.0.0.1
+        self.process = None
+        self.ports = []
+
+    def host_url(self, host, ports):
+        """
+        Function to get the root url of a host, eg. 'http://127.0.0.1:8080' or 'http://host3.bench:8080'.
+        """
+        if self.host_names:
+            return 'http://host%d.bench:%d' % (host, ports[host])
+        return 'http://127.0.0.1:%d' % ports[host]
+
+    def robots_variant(self, host):
+        if self.robots == 'mixed':
+            return ROBOTS_VARIANTS[host % len(ROBOTS_VARIANTS)]
+        return self.robots
+
+    def link_target(self, rng, page):
+        if self.graph == 'chain':
+            return (page + 1) % self.pages
+        if self.graph == 'powerlaw':
+            return min(int(rng.paretovariate(1.2)) - 1, self.pages - 1)
+        return rng.randrange(self.pages)
+
+    def build_site(self, host, ports):
+        """
+        Function to build all responses of one host.
+        Inputs: host (int), the number of the host
+                ports (list of int), the port of every host
+        Output: site (dict), path: (status, content type, body)
+        """
+        rng = random.Random('%d-%d' % (self.seed, host))
+        site = {}
+        status, robots_text = robotsFile(self.robots_variant(host), self.crawl_delay, rng)
+        site['/robots.txt'] = (status, 'text/plain', robots_text)
+        if self.tos != 'none':
+            site['/terms'] = (200, 'text/plain', termsPage(self.tos))
+
+        filler = '<p>%s</p>\n' % FILLER
+        padding = filler * max(self.page_bytes // len(filler), 0)
+        homepage_links = ['<a href="/terms">Terms of Service</a>'] if self.tos != 'none' else []
+        homepage_links.append('<a href="/p0">Start</a>')
+        site['/'] = (200, 'text/html', '<html><body>%s</body></html>' % ''.join(homepage_links))
+
+        for page in range(self.pages):
+            hrefs = []
+            for i in range(self.links):
+                if self.hosts > 1 and rng.random() < self.external:
+                    other = rng.randrange(self.hosts - 1)
+                    other += other >= host
+                    hrefs.append('%s/p%d' % (self.host_url(other, ports), self.link_target(rng, page)))
+                    continue
+                target = self.link_target(rng, page)
+                form = i % 6
+                if form == 0:
+                    hrefs.append('p%d' % target)
+                elif form == 1:
+                    hrefs.append('/p%d' % target)
+                elif form == 2:
+                    hrefs.append('./p%d#section' % target)
+                elif form == 3:
+                    hrefs.append('/p%d?utm_source=benchmark&page=%d' % (target, target))
+                elif form == 4:
+                    hrefs.append('%s/p%d' % (self.host_url(host, ports), target))
+                else:
+                    hrefs.append('/private/p%d' % target)
+            body = '<html><head><title>Page %d</title></head><body>\n%s\n%s</body></html>' % (
+                page, '\n'.join('<a href="%s">link %d</a>' % (href, i) for i, href in enumerate(hrefs)), padding)
+            site['/p%d' % page] = (200, 'text/html; charset=utf-8', body)
+            site['/private/p%d' % page] = (200, 'text/html; charset=utf-8', body)
+        return site
+
+    def serve(self, connection):
+        """
+        Function run in the server process: binds a port for every host, builds the sites and serves them until killed.
+        Input: connection (multiprocessing Connection), the ports are sent back on it.
+        """
+        servers = []
+        for host in range(self.hosts):
+            server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), SyntheticHandler)
+            server.daemon_threads = True
+            servers.append(server)
+        ports = [server.server_address[1] for server in servers]
+        for host, server in enumerate(servers):
+            server.site = self.build_site(host, ports)
+            server.latency = latencyProfile(self.latency, random.Random('%d-latency-%d' % (self.seed, host)))
+            threading.Thread(target = server.serve_forever, daemon = True).start()
+        connection.send(ports)
+        threading.Event().wait()
+
+    def start(self):
+        """
+        Function to start serving the hosts in a separate process.
+        Output: seed (str), the URL to start the crawl from.
+        """
+        parent_connection, child_connection = Pipe()
+        self.process = Process(target = self.serve, args = (child_connection,), daemon = True)
+        self.process.start()
+        self.ports = parent_connection.recv()
+        return self.host_url(0, self.ports) + '/'
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+            self.process = None
+
+class SyntheticHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'                                               # Keep-alive, like real servers
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        delay = self.server.latency()
+        if delay > 0:
+            time.sleep(delay)
+        status, content_type, body = self.server.site.get(self.path.split('?', 1)[0], (404, 'text/plain', 'Not found'))
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+# 1.3. Instrumented crawler
+
+class StubResolver():
+    """
+    Resolver for a DnsCache, standing in for a DNS server: names under .bench are 127.0.0.1 (see SyntheticWeb host_names),
+    answered after latency seconds. Other names don't exist.
+    """
+
+    def __init__(self, latency = 0.0):
+        self.latency = latency
+        self.lookups = 0
+
+    def __call__(self, host):
+        self.lookups += 1
+        time.sleep(self.latency)
+        if host.endswith('.bench'):
+            return ['127.0.0.1'], None
+        raise socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+
+class TimedScheduler(HostScheduler):
+    """
+    HostScheduler that adds the time each thread spends waiting for crawl-delays to local.waited.
+    """
+
+    def __init__(self, local):
+        HostScheduler.__init__(self)
+        self.local = local
+
+    def wait(self, host, delay):
+        start = time.perf_counter()
+        waited = HostScheduler.wait(self, host, delay)
+        self.local.waited = getattr(self.local, 'waited', 0.0) + time.perf_counter() - start
+        return waited
+
+class BenchCrawler(Crawler):
+    """
+    Crawler that scales every crawl-delay by delay_scale and times its stages:
+    fetch latency (until the response headers arrive, crawl-delay waits not included), robots_check, ToS_check,
+    and parse time per page: the time visit spends outside fetch, robots_check and ToS_check. That is reading the
+    streamed body, extracting and resolving the links.
+    """
+
+    def __init__(self, seed, num_to_visit, delay_scale, scorers = None, resolver = None, dns_ttl = 300):
+        Crawler.__init__(self, seed, num_to_visit, True, [''], RulePolicy(), scorers = scorers)
+        if resolver is not None:
+            self.dns.close()
+            self.dns = DnsCache(resolver, ttl = dns_ttl, metrics = self.metrics)
+            self.sessions.dns = self.dns                                        # No sessions have been made yet
+        self.delay_scale = delay_scale
+        self.local = threading.local()
+        self.scheduler = TimedScheduler(self.local)
+        self.fetch_latencies = []                                               # list.append is atomic, so the worker threads can share these
+        self.robots_times = []
+        self.tos_times = []
+        self.parse_times = []
+
+    def host_delay(self, root_url):
+        return Crawler.host_delay(self, root_url) * self.delay_scale
+
+    def fetch(self, url, stream = False, partial = False):
+        waited = getattr(self.local, 'waited', 0.0)
+        start = time.perf_counter()
+        response = Crawler.fetch(self, url, stream, partial)
+        elapsed = time.perf_counter() - start
+        self.fetch_latencies.append(elapsed - (self.local.waited - waited))
+        self.local.fetched = getattr(self.local, 'fetched', 0.0) + elapsed
+        return response
+
+    def timed(self, function, *args):
+        """
+        Function to call a function and time it, without the time spent in fetch.
+        Output: the result of the function, seconds (float)
+        """
+        fetched = getattr(self.local, 'fetched', 0.0)
+        start = time.perf_counter()
+        result = function(*args)
+        return result, time.perf_counter() - start - (getattr(self.local, 'fetched', 0.0) - fetched)
+
+    def robots_check(self, target = None):
+        result, seconds = self.timed(Crawler.robots_check, self, target)
+        self.robots_times.append(seconds)
+        self.local.checks += seconds
+        return result
+
+    def ToS_check(self, target = None):
+        result, seconds = self.timed(Crawler.ToS_check, self, target)
+        self.tos_times.append(seconds)
+        self.local.checks += seconds
+        return result
+
+    def visit(self, target):
+        self.local.checks = 0.0
+        (site_record, links), seconds = self.timed(Crawler.visit, self, target)
+        if links is not None:
+            self.parse_times.append(seconds - self.local.checks)
+        return site_record, links
+
+# 1.4. Run and report
+
+def percentile(values, fraction):
+    """
+    Function to get a percentile (nearest rank) of a list of numbers.
+    Inputs: values (list of float)
+            fraction (float), eg. 0.99
+    Output: (float), None for an empty list.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(int(math.ceil(fraction * len(values))) - 1, 0)]
+
+def peakRss():
+    """
+    Function to get the peak resident memory of this process.
+    Output: (int), bytes
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':                                                # Bytes on macOS, kilobytes elsewhere
+        return peak
+    return peak * 1024
+
+def runBenchmark(web, num_to_visit, max_hosts = 8, delay_scale = 0.01, metrics_path = None, scorers = None, resolver = None, dns_ttl = 300):
+    """
+    Function to crawl a SyntheticWeb and measure the crawl.
+    Inputs: web (SyntheticWeb)
+            num_to_visit (int), sites to visit
+            max_hosts (int), hosts crawled at the same time
+            delay_scale (float), every crawl-delay is multiplied by this
+            metrics_path (str), also write the crawler's own metrics (per stage, Prometheus text format) to this file
+            scorers (list of FrontierScorer), to crawl with a PriorityFrontier. None for first in first out.
+            resolver (StubResolver), resolves the host names of a SyntheticWeb with host_names. None for the system resolver.
+            dns_ttl (float), seconds the DnsCache keeps addresses from the resolver
+    Output: results (dict)
+    """
+    seed = web.start()
+    try:
+        crawler = BenchCrawler(seed, num_to_visit, delay_scale, scorers, resolver, dns_ttl)
+        start = time.perf_counter()
+        asyncio.run(AsyncCrawlEngine(crawler, max_hosts).run())
+        wall = time.perf_counter() - start
+        crawler.close()
+        if metrics_path:
+            crawler.metrics.write(metrics_path)
+    finally:
+        web.stop()
+
+    def ms(seconds):
+        return None if seconds is None else round(seconds * 1000, 3)
+
+    return {'pages_visited':crawler.counter_total,
+            'hosts_visited':len(set(hostOfUrl(url, with_port = True) for url in crawler.sites_visited)),
+            'attempts':crawler.counter_attempts,
+            'wall_s':round(wall, 3),
+            'pages_per_s':round(crawler.counter_total / wall, 2) if wall > 0 else None,
+            'requests':len(crawler.fetch_latencies),
+            'fetch_p50_ms':ms(percentile(crawler.fetch_latencies, 0.5)),
+            'fetch_p99_ms':ms(percentile(crawler.fetch_latencies, 0.99)),
+            'parse_mean_ms':ms(sum(crawler.parse_times) / len(crawler.parse_times)) if crawler.parse_times else None,
+            'parse_p99_ms':ms(percentile(crawler.parse_times, 0.99)),
+            'robots_check_mean_ms':ms(sum(crawler.robots_times) / len(crawler.robots_times)) if crawler.robots_times else None,
+            'tos_check_mean_ms':ms(sum(crawler.tos_times) / len(crawler.tos_times)) if crawler.tos_times else None,
+            'dns_lookups':resolver.lookups if resolver is not None else None,
+            'peak_rss_mb':round(peakRss() / 2**20, 1)}
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Benchmark the crawler against a synthetic web served on local ports.')
+    parser.add_argument('--hosts', type = int, default = 8, help = 'number of synthetic hosts (default: 8)')
+    parser.add_argument('--pages', type = int, default = 100, help = 'pages per host (default: 100)')
+    parser.add_argument('--links', type = int, default = 20, help = 'links per page (default: 20)')
+    parser.add_argument('--external', type = float, default = 0.2, help = 'fraction of links to other hosts (default: 0.2)')
+    parser.add_argument('--graph', choices = GRAPH_KINDS, default = 'random', help = 'link graph (default: random)')
+    parser.add_argument('--robots', choices = ROBOTS_VARIANTS + ('mixed',), default = 'open', help = 'robots.txt variant, mixed for one of each (default: open)')
+    parser.add_argument('--tos', choices = TOS_VARIANTS, default = 'plain', help = 'terms of service page (default: plain)')
+    parser.add_argument('--latency', default = 'none', help = "server latency: none, fixed:MS, lognormal:MEDIAN_MS:SIGMA or tail:MS:SLOW_MS:FRACTION (default: none)")
+    parser.add_argument('--page-bytes', type = int, default = 20000, help = 'approximate size of each page (default: 20000)')
+    parser.add_argument('--crawl-delay', type = float, default = 1.0, help = 'Crawl-delay the robots files declare, before scaling (default: 1)')
+    parser.add_argument('--delay-scale', type = float, default = 0.01, help = 'multiply every crawl-delay by this (default: 0.01)')
+    parser.add_argument('--visit', type = int, default = 200, help = 'number of sites to visit (default: 200)')
+    parser.add_argument('--max-hosts', type = int, default = 8, help = 'hosts crawled at the same time (default: 8)')
+    parser.add_argument('--seed', type = int, default = 0, help = 'random seed for the synthetic web (default: 0)')
+    parser.add_argument('--priority', metavar = 'SCORERS', help = "crawl with a priority frontier, eg. 'depth,hosts:2,inlinks,novelty:5' (default: first in first out)")
+    parser.add_argument('--dns-latency', type = float, help = 'give the hosts names, resolved by a stub DNS resolver that takes this many ms (default: use 127.0.0.1, no DNS)')
+    parser.add_argument('--dns-ttl', type = float, default = 300, help = 'with --dns-latency, seconds the DNS cache keeps an answer. 0 to look up for every connection (default: 300)')
+    parser.add_argument('--json', help = 'also write the results to this file')
+    parser.add_argument('--metrics', help = "also write the crawler's metrics (Prometheus text format) to this file")
+    args = parser.parse_args(argv)
+
+    web = SyntheticWeb(args.hosts, args.pages, args.links, args.external, args.graph, args.robots, args.tos,
+                       args.latency, args.crawl_delay, args.page_bytes, args.seed, host_names = args.dns_latency is not None)
+    resolver = StubResolver(args.dns_latency / 1000) if args.dns_latency is not None else None
+    scorers = parseScorers(args.priority) if args.priority else None
+    results = runBenchmark(web, args.visit, args.max_hosts, args.delay_scale, args.metrics, scorers, resolver, args.dns_ttl)
+    results['config'] = vars(args)
+    for key, value in results.items():
+        if key != 'config':
+            print('%-22s %s' % (key, value))
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(results, json_file, indent = 2)
+
+if __name__ == '__main__':
+    main()
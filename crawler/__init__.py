@@ -0,0 +1,73 @@
+# Date: 15/09/20
+# Author: Manoj Abhishetty
+# Edition: 3
+
+# A crawler of a small portion of the web, to develop a network representation. For example:
+#     from crawler import Crawler, RulePolicy
+#     myCrawler = Crawler('https://www.abcd.com', 100, False, [], RulePolicy.from_file('policy.json'))
+#     sites_dict = myCrawler.run()
+#     myCrawler.close()
+# Or from the command line: python -m crawler --config crawl.json (see cli.loadConfig).
+
+# Structure::
+# records.py    - Compact crawl records, and the entries of sites_dict built from them.
+# metrics.py    - Metrics.
+# urls.py       - URL canonicalisation and filtering.
+# robots.py     - Robots.txt rules and per-host cache.
+# policy.py     - Crawl policies, and the cache of terms of service outcomes.
+# politeness.py - Politeness.
+# sessions.py   - HTTP sessions and DNS cache.
+# frontier.py   - Frontier and seen set.
+# links.py      - Link extraction.
+# graph.py      - Graph export.
+# core.py       - Crawler.
+# engine.py     - Asyncio crawl engine.
+# store.py      - Crawl state on disk.
+# cache.py      - HTTP response cache.
+# shards.py     - Sharded crawling.
+# cli.py        - Command line.
+
+import importlib
+
+# The names below are imported from their module when they are first used, so importing the package is quick
+# and doesn't load requests until a crawl needs it.
+EXPORTS = {}
+for module_name, names in (('records', ['getSiteStatus', 'siteOutcome', 'siteRecord', 'UrlTable', 'CrawlRecords', 'SitesDictView']),
+                           ('metrics', ['STAGE_BUCKETS', 'Metrics', 'TimedIterator', 'MetricsWriter', 'MetricsServer']),
+                           ('urls', ['splitRootUrl', 'hostOfUrl', 'TRACKING_PARAMS', 'SCHEME_RE', 'PERCENT_RE', 'UNRESERVED', 'DEFAULT_PORTS',
+                                     'normalisePercent', 'removeDotSegments', 'canonicaliseUrl', 'baseOrigin', 'resolveUrl', 'resolveLinks',
+                                     'UrlFilter']),
+                           ('robots', ['list_splitter', 'robotsPatternToRegex', 'RobotsRules', 'parseRobots', 'cacheTtlFromHeaders', 'RobotsCache']),
+                           ('policy', ['CrawlPolicy', 'keywordPattern', 'RulePolicy', 'InteractivePolicy', 'TOS_KEYWORDS', 'relevantTerms', 'TermsCache']),
+                           ('politeness', ['HostScheduler', 'retryAfterSeconds', 'RateController']),
+                           ('sessions', ['systemResolver', 'DnsCache', 'ConnectTimer', 'TimedHTTPConnection', 'TimedHTTPSConnection',
+                                         'TimedHTTPConnectionPool', 'TimedHTTPSConnectionPool', 'TimedAdapter', 'SessionPool']),
+                           ('frontier', ['BloomFilter', 'SeenSet', 'Frontier', 'FrontierScorer', 'DepthScorer', 'InLinkScorer', 'HostScorer',
+                                         'NoveltyScorer', 'SCORERS', 'parseScorers', 'PriorityFrontier']),
+                           ('links', ['LinkExtractor', 'iterLinks', 'responseChunks', 'HTML_TYPES', 'bodyProblem']),
+                           ('graph', ['GraphExporter', 'EdgeListExporter', 'GraphMLExporter', 'CsrExporter']),
+                           ('core', ['Crawler']),
+                           ('engine', ['AsyncCrawlEngine']),
+                           ('store', ['CrawlStore']),
+                           ('cache', ['ResponseCache']),
+                           ('shards', ['HashRing', 'ShardState', 'ShardBroker', 'ShardCrawler', 'ShardEngine', 'runShard', 'ShardedCrawl']),
+                           ('cli', ['loadConfig', 'askForSettings', 'main'])):
+    for name in names:
+        EXPORTS[name] = module_name
+del module_name, names, name
+__all__ = list(EXPORTS)
+
+def __getattr__(name):
+    """
+    Function to import a name of the package from its module, the first time it is used.
+    Input: name (str)
+    Output: the class, function or constant
+    """
+    if name not in EXPORTS:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    value = getattr(importlib.import_module('.' + EXPORTS[name], __name__), name)
+    globals()[name] = value                                                     # Found directly from now on
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(EXPORTS))
@@ -0,0 +1,5 @@
+# python -m crawler: see cli.main.
+
+from .cli import main
+
+main()
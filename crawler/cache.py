@@ -0,0 +1,151 @@
+# HTTP response cache.
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+import requests
+
+from .urls import canonicaliseUrl
+
+class ResponseCache():
+    """
+    Keeps the responses of earlier crawls in an SQLite database, so that a recrawl only downloads the pages that changed.
+    Responses with an ETag or Last-Modified are stored under their canonical URL, with the body compressed (zlib) and, for
+    visited sites, the links found on them. The next request for the URL is made conditional (If-None-Match /
+    If-Modified-Since), and if the server answers 304 Not Modified the response is rebuilt from the cache.
+    Once the stored responses take up more than max_bytes, the least recently used ones are dropped.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, status INTEGER, content_type TEXT,
+                                              encoding TEXT, body BLOB, complete INTEGER, links BLOB, size INTEGER, used REAL);
+        CREATE INDEX IF NOT EXISTS responses_used ON responses (used);
+    """
+    COLUMNS = ('etag', 'last_modified', 'status', 'content_type', 'encoding', 'body', 'complete', 'links')
+
+    def __init__(self, path, max_bytes = 256 * 2**20, compress_level = 6):
+        self.path = path                                                        # Path of the SQLite database. Shards can share it.
+        self.max_bytes = max_bytes                                              # Most bytes (compressed bodies and links) to keep
+        self.compress_level = compress_level                                    # zlib level, 1 (fast) to 9 (small)
+        self.lock = threading.Lock()                                            # Sites are visited from several threads
+        self.connection = sqlite3.connect(path, timeout = 30, check_same_thread = False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(self.SCHEMA)
+        self.size = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    @staticmethod
+    def conditional_headers(cached):
+        """
+        Function to get the headers that make a request conditional on the cached response being out of date.
+        Input: cached (dict), from lookup
+        Output: headers (dict)
+        """
+        headers = {}
+        if cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+        return headers
+
+    def lookup(self, url, partial = False):
+        """
+        Function to find the cached response for a url.
+        Inputs: url (str)
+                partial (Bool), if True a body that was only read in part (and has no links stored) will do
+        Output: cached (dict) with the columns of the responses table, still compressed. None if there is no usable response.
+        """
+        with self.lock:
+            row = self.connection.execute('SELECT ' + ', '.join(self.COLUMNS) + ' FROM responses WHERE url = ?', (canonicaliseUrl(url),)).fetchone()
+        if row is None:
+            return None
+        cached = dict(zip(self.COLUMNS, row))
+        if not (cached['complete'] or cached['links'] is not None or partial):
+            return None
+        return cached
+
+    def cached_response(self, url, cached, not_modified):
+        """
+        Function to answer a 304 Not Modified from the cache.
+        Inputs: url (str)
+                cached (dict), from lookup
+                not_modified (requests.response object), the 304. It is closed here.
+        Output: requests.response object with the cached status and body, and the headers of the 304.
+                .from_cache is True, and .cached_links are the links stored with it (None if there are none).
+        """
+        not_modified.close()
+        with self.lock:
+            with self.connection:
+                self.connection.execute('UPDATE responses SET used = ? WHERE url = ?', (time.time(), canonicaliseUrl(url)))
+        response = requests.Response()
+        response.status_code = cached['status']
+        response.headers = requests.structures.CaseInsensitiveDict(not_modified.headers)
+        if cached['content_type']:
+            response.headers['Content-Type'] = cached['content_type']
+        response.headers.pop('Content-Length', None)
+        response._content = zlib.decompress(cached['body'])
+        response._content_consumed = True                                       # So iter_content gives slices of _content
+        response.encoding = cached['encoding']
+        response.url = url
+        response.request = not_modified.request
+        response.elapsed = not_modified.elapsed
+        response.from_cache = True
+        response.cached_links = json.loads(zlib.decompress(cached['links'])) if cached['links'] is not None else None
+        return response
+
+    def store(self, url, response, body, links = None, complete = True):
+        """
+        Function to keep a response for conditional requests. Only 200s with an ETag or Last-Modified can be kept.
+        Inputs: url (str)
+                response (requests.response object)
+                body (bytes or str), the body as read. A str is stored as utf-8.
+                links (list of str), the links found on the page, to reuse after a 304. None if it wasn't visited.
+                complete (Bool), False if only the start of the body was read. Such a body only replaces a cached one
+                                 if the page has changed.
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if response.status_code != 200 or not (etag or last_modified) or 'no-store' in response.headers.get('Cache-Control', ''):
+            return
+        if isinstance(body, str):
+            body, encoding = body.encode('utf-8'), 'utf-8'
+        else:
+            encoding = response.encoding
+        body = zlib.compress(body, self.compress_level)
+        if links is not None:
+            links = zlib.compress(json.dumps(links).encode('utf-8'), self.compress_level)
+        size = len(body) + len(links or b'')
+        key = canonicaliseUrl(url)
+        with self.lock:
+            old = self.connection.execute('SELECT etag, last_modified, size FROM responses WHERE url = ?', (key,)).fetchone()
+            if old is not None and not complete and old[:2] == (etag, last_modified):
+                return
+            with self.connection:
+                self.connection.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                        (key, etag, last_modified, response.status_code, response.headers.get('Content-Type'),
+                                         encoding, body, int(complete), links, size, time.time()))
+            self.size += size - (old[2] if old is not None else 0)
+            if self.size > self.max_bytes:
+                self.evict()
+
+    def evict(self):
+        """
+        Function to drop the least recently used responses, until they take up 90% of max_bytes. Call with self.lock held.
+        """
+        # Other processes (shards) may share the file, so count again before dropping anything.
+        self.size = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        dropped = []
+        for url, size in self.connection.execute('SELECT url, size FROM responses ORDER BY used'):
+            if self.size <= 0.9 * self.max_bytes:
+                break
+            dropped.append((url,))
+            self.size -= size
+        with self.connection:
+            self.connection.executemany('DELETE FROM responses WHERE url = ?', dropped)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,282 @@
+# Command line: settings from a config file or the keyboard, and the crawl itself.
+
+import argparse
+import json
+import logging
+import os
+from sys import exit
+
+# The crawler itself (and requests) is imported in main, once the arguments are known. So --help, and a mistake in the
+# arguments or the config file, don't wait for it.
+
+def loadConfig(path):
+    """
+    Function to read the settings of a new crawl from a JSON config file, instead of asking for them. For example:
+        {"start_site": "https://www.abcd.com", "num_to_visit": 500, "secured": false,
+         "no_goes": ["https://www.abcd.com/private"], "policy_file": "policy.json", "max_hosts": 8}
+    A crawl policy is needed, as 'policy_file' (relative to the config file) or as an inline 'policy' in the format of
+    RulePolicy.from_dict: nobody is there to be asked about each site. max_hosts (default 8) and priority (see --priority) may be left out.
+    Input: path (str)
+    Output: settings (dict), with the same keys as askForSettings, and 'policy' and 'priority'.
+    """
+    with open(path) as config_file:
+        config = json.load(config_file)
+    if not isinstance(config, dict):
+        raise ValueError('the config file should hold a JSON object')
+    unknown = set(config) - {'start_site', 'num_to_visit', 'secured', 'no_goes', 'policy_file', 'policy', 'max_hosts', 'priority'}
+    if unknown:
+        raise ValueError('unknown settings: ' + ', '.join(sorted(unknown)))
+    for key in ('start_site', 'num_to_visit', 'secured'):
+        if key not in config:
+            raise ValueError("'%s' is missing" % key)
+    if not isinstance(config['start_site'], str) or '//' not in config['start_site']:
+        raise ValueError("'start_site' should be a URL, eg. 'https://www.abcd.com'")
+    for key, default in (('num_to_visit', None), ('max_hosts', 8)):
+        value = config.get(key, default)
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            raise ValueError("'%s' should be a whole number of at least 1" % key)
+    if not isinstance(config['secured'], bool):
+        raise ValueError("'secured' should be true or false")
+    no_goes = config.get('no_goes', [])
+    if not isinstance(no_goes, list) or not all(isinstance(no_go, str) for no_go in no_goes):
+        raise ValueError("'no_goes' should be a list of URLs")
+    policy_file = config.get('policy_file') or ''
+    policy = config.get('policy')
+    if not policy_file and policy is None:
+        raise ValueError("a crawl policy is needed, as 'policy_file' or 'policy'")
+    if policy is not None and not isinstance(policy, dict):
+        raise ValueError("'policy' should be a JSON object, see RulePolicy")
+    if policy_file:
+        policy_file = os.path.join(os.path.dirname(path), policy_file)
+        if not os.path.isfile(policy_file):
+            raise ValueError("the 'policy_file' %s doesn't exist" % policy_file)
+
+    # The policy and the scorers are checked now, before a crawl is started with them. Neither module needs requests.
+    from .frontier import parseScorers
+    from .policy import RulePolicy
+    try:
+        if policy is not None:
+            RulePolicy.from_dict(policy)
+        else:
+            RulePolicy.from_file(policy_file)
+    except (AttributeError, TypeError, ValueError) as policy_error:
+        raise ValueError('in the crawl policy: ' + str(policy_error))
+    if config.get('priority') is not None:
+        if not isinstance(config['priority'], str):
+            raise ValueError("'priority' should be a string like 'depth,hosts:2'")
+        try:
+            parseScorers(config['priority'])
+        except ValueError as scorer_error:
+            raise ValueError("in 'priority': " + str(scorer_error))
+    return {'start_site':config['start_site'],
+            'num_to_visit':config['num_to_visit'],
+            'secured':config['secured'],
+            'no_goes':no_goes,
+            'policy_file':policy_file,
+            'policy':policy,
+            'max_hosts':config.get('max_hosts', 8),
+            'priority':config.get('priority')}
+
+def askForSettings():
+    """
+    Function to ask the user for the settings of a new crawl.
+    Output: settings (dict), with start_site, num_to_visit, secured, no_goes, policy_file and max_hosts.
+    """
+    print("""\
+This script aims to crawl a small portion of the web to develop a network representation.
+This is so that mathematical techniques can be used to analyse network structure.
+You now need to give some inputs: """)
+    # 1.3.1. Ask for seed site, sites you want to avoid, https issues, how many to visit,
+    start_site = input("Type the website you wish to start from: ")
+    avoid_sites = input("Are there any sites you wish to avoid? Type them here, separated by a pipe (|). All sites in those domains won't be visited, so just type in the root and all sites beneath it will be avoided: ")
+    steps = input("How many sites would you like to visit. These are the sites we will actually go to: ")
+    secured = input("Enter 'True' if you would like to include sites that are not secured (http). Enter 'False' if not: ")
+    policy_file = input("Type the path of a crawl policy file (JSON) to crawl unattended, or leave empty to be asked about each site: ")
+    hosts_at_once = input("How many hosts should be crawled at the same time? Each host still gets one connection and its crawl-delay: ")
+
+    # 1.4. Store all from inputs
+    try:
+        start_site_string = str(start_site)
+    except:
+        exit("Error while handling starting website string")
+
+    try:
+        steps_number = int(steps)
+    except ValueError:
+        exit("Error while handling the number of steps. Please enter an integer")
+    except:
+        exit("Error while handling the number of steps.")
+
+    try:
+        hosts_number = int(hosts_at_once)
+    except ValueError:
+        exit("Error while handling the number of hosts. Please enter an integer")
+    if hosts_number < 1:
+        exit("Error while handling the number of hosts. Please enter at least 1")
+
+    #3.1: 2.3
+    if 'True' in secured:
+        secured_bool = True
+    else:
+        secured_bool = False
+
+    try:
+        no_go_list = avoid_sites.split('|')
+    except:
+        exit("Error when splitting the 'no-go' sites")
+
+    return {'start_site':start_site_string,
+            'num_to_visit':steps_number,
+            'secured':secured_bool,
+            'no_goes':no_go_list,
+            'policy_file':policy_file.strip(),
+            'max_hosts':hosts_number}
+
+def main(argv = None):
+    """
+    Function to run a crawl from the command line. A new crawl reads its settings from --config, or asks for them.
+    --resume carries on from the last checkpoint.
+    Input: argv (list of str), the command line arguments. Defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(description = 'Crawl a small portion of the web to develop a network representation.')
+    parser.add_argument('--config', help = 'JSON file with the settings of a new crawl (see loadConfig), instead of asking for them')
+    parser.add_argument('--state', default = 'crawl_state.db', help = 'SQLite file the crawl state is checkpointed to (default: crawl_state.db)')
+    parser.add_argument('--resume', action = 'store_true', help = 'carry on with the crawl checkpointed in the --state file')
+    parser.add_argument('--edges-csv', help = 'write the network to this file as an edge list CSV')
+    parser.add_argument('--graphml', help = 'write the network to this file as GraphML')
+    parser.add_argument('--npz', help = 'write the network to this file as a sparse CSR adjacency matrix (needs numpy)')
+    parser.add_argument('--shards', type = int, default = 0, help = 'crawl with this many processes, each with its own share of the hosts (needs a policy file)')
+    parser.add_argument('--listen', default = '127.0.0.1:0', help = 'HOST:PORT the shards connect to (default: 127.0.0.1, any free port)')
+    parser.add_argument('--local-shards', type = int, help = 'how many of the shards to start here (default: all). The others --join from other machines')
+    parser.add_argument('--join', metavar = 'HOST:PORT', help = 'crawl one shard (--shard) of a sharded crawl that is listening on HOST:PORT')
+    parser.add_argument('--shard', type = int, default = 0, help = 'the shard to crawl with --join')
+    parser.add_argument('--metrics-file', help = 'write the metrics to this file (Prometheus text format) every 10 seconds and at the end')
+    parser.add_argument('--metrics-port', type = int, help = 'serve the metrics for Prometheus on this port of 127.0.0.1')
+    parser.add_argument('--profile', help = 'profile some of the site visits with cProfile, and write the statistics to this file')
+    parser.add_argument('--profile-every', type = int, default = 100, help = 'with --profile, profile one in this many visits (default: 100)')
+    parser.add_argument('--priority', metavar = 'SCORERS', help = "visit the best sites first instead of in the order they are found, scored by eg. 'depth,hosts:2,inlinks,novelty:5' (NAME[:WEIGHT], hosts:WEIGHT:QUOTA for a quota per host)")
+    parser.add_argument('--http-cache', help = 'SQLite file of responses kept between crawls. A recrawl asks servers for changed pages only')
+    parser.add_argument('--http-cache-size', type = int, default = 256, help = 'most megabytes the --http-cache file keeps (default: 256)')
+    parser.add_argument('--tos-cache', help = 'SQLite file the outcome of the terms of service check of each host is kept in between crawls')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level = logging.INFO, format = '%(message)s')
+    if args.config and args.resume:
+        exit("--config is for a new crawl, --resume carries on with the settings of the checkpoint")
+    config_settings = None
+    if args.config:
+        try:
+            config_settings = loadConfig(args.config)
+        except (OSError, ValueError) as config_error:
+            exit("Error while reading the config file: " + str(config_error))
+
+    from .cache import ResponseCache
+    from .core import Crawler
+    from .frontier import parseScorers
+    from .graph import CsrExporter, EdgeListExporter, GraphMLExporter
+    from .metrics import MetricsServer, MetricsWriter
+    from .policy import InteractivePolicy, RulePolicy, TermsCache
+    from .shards import ShardedCrawl, runShard
+    from .store import CrawlStore
+
+    # Shards on other machines share a key with the coordinator, through the CRAWL_AUTHKEY environment variable.
+    authkey = os.environ.get('CRAWL_AUTHKEY')
+    if authkey is not None:
+        authkey = authkey.encode('utf-8')
+    if args.join:
+        if authkey is None:
+            exit("Set CRAWL_AUTHKEY to the key of the crawl to join")
+        host, _, port = args.join.rpartition(':')
+        runShard((host, int(port)), authkey, args.shard)
+        return
+    if args.shards:
+        if args.resume:
+            exit("--resume isn't supported for sharded crawls")
+        if args.local_shards is not None and args.local_shards < args.shards and authkey is None:
+            exit("Set CRAWL_AUTHKEY, so the shards on other machines can --join")
+
+    # 1. Settings: from the checkpoint, the config file or the user.
+    if args.resume:
+        if not os.path.exists(args.state):
+            exit("There is no crawl to resume in " + args.state)
+        store = CrawlStore(args.state)
+        settings = store.load_settings()
+    else:
+        if os.path.exists(args.state):
+            exit(args.state + " already exists. Use --resume to carry on with that crawl, or give another --state file")
+        if config_settings is not None:
+            settings = config_settings
+        else:
+            settings = askForSettings()
+        if args.priority or not settings.get('priority'):
+            settings['priority'] = args.priority
+
+    # 2. The policy and scorers. For a new crawl this is before the state file is made, so a mistake doesn't leave one behind.
+    if settings.get('policy') is not None:                                      # Inline in the config file
+        try:
+            crawl_policy = RulePolicy.from_dict(settings['policy'])
+        except (AttributeError, TypeError, ValueError) as policy_error:
+            exit("Error in the crawl policy of the config file: " + str(policy_error))
+    elif settings['policy_file']:
+        try:
+            crawl_policy = RulePolicy.from_file(settings['policy_file'])
+        except (OSError, ValueError) as policy_error:
+            exit("Error while reading the crawl policy file: " + str(policy_error))
+    elif args.shards:
+        exit("A sharded crawl needs a crawl policy file, the shards can't ask about each site")
+    else:
+        crawl_policy = InteractivePolicy()                                      # Someone is at the keyboard: ask them about each host
+
+    scorers = None
+    if settings.get('priority'):                                                # Checkpoints from before --priority have no entry
+        try:
+            scorers = parseScorers(settings['priority'])
+        except ValueError as scorer_error:
+            exit("Error in --priority: " + str(scorer_error))
+
+    if not args.resume:
+        store = CrawlStore(args.state)
+        store.save_settings(settings)
+
+    # 3. Create object
+    myCrawler = Crawler(settings['start_site'], settings['num_to_visit'], settings['secured'], settings['no_goes'], crawl_policy, scorers = scorers)
+    if args.resume:
+        myCrawler.restore(store)
+    else:
+        myCrawler.attach_store(store)
+    if args.edges_csv:
+        myCrawler.add_exporter(EdgeListExporter(args.edges_csv))
+    if args.graphml:
+        myCrawler.add_exporter(GraphMLExporter(args.graphml))
+    if args.npz:
+        myCrawler.add_exporter(CsrExporter(args.npz))
+    if args.profile:
+        myCrawler.metrics.profile_every = args.profile_every
+    if args.http_cache:
+        myCrawler.http_cache = ResponseCache(args.http_cache, args.http_cache_size * 2**20)
+    if args.tos_cache:
+        myCrawler.terms_cache = TermsCache(args.tos_cache)
+    metrics_outputs = []
+    if args.metrics_file:
+        metrics_outputs.append(MetricsWriter(myCrawler.metrics, args.metrics_file))
+    if args.metrics_port:
+        metrics_outputs.append(MetricsServer(myCrawler.metrics, ('127.0.0.1', args.metrics_port)))
+
+    ###------------------------------- CRAWL -------------------------------###
+    try:
+        if args.shards:
+            host, _, port = args.listen.rpartition(':')
+            sharded = ShardedCrawl(myCrawler, args.shards, settings['max_hosts'], (host, int(port)), authkey, args.local_shards)
+            sharded.serve()
+            print("Shards can join on %s:%d" % sharded.address)
+            sharded.run()
+        else:
+            myCrawler.run(settings['max_hosts'])
+    finally:
+        myCrawler.close()
+        store.close()
+        myCrawler.close_exporters()
+        for metrics_output in metrics_outputs:
+            metrics_output.close()
+        if args.profile:
+            myCrawler.metrics.dump_profile(args.profile)
+    print("Finished.")
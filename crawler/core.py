@@ -0,0 +1,614 @@
+# Crawler.
+
+import asyncio
+import hashlib
+import logging
+import time
+
+import requests
+
+from .cache import ResponseCache
+from .engine import AsyncCrawlEngine
+from .frontier import Frontier, PriorityFrontier, SeenSet
+from .links import HTML_TYPES, LinkExtractor, bodyProblem, iterLinks, responseChunks
+from .metrics import Metrics, TimedIterator
+from .policy import RulePolicy, TermsCache, relevantTerms
+from .politeness import HostScheduler, RateController
+from .records import CrawlRecords, SitesDictView, getSiteStatus, siteOutcome, siteRecord
+from .robots import RobotsCache, RobotsRules, parseRobots
+from .sessions import DnsCache, SessionPool
+from .urls import UrlFilter, hostOfUrl, resolveLinks, splitRootUrl
+
+logger = logging.getLogger(__name__)                                            # Diagnostics. main() shows them on the console.
+
+class Crawler():
+
+    def __init__(self, starting_site, num_to_visit, secured, no_goes, policy = None, bloom_capacity = None, scorers = None):
+        self.seen_capacity = bloom_capacity                                     # Use a Bloom filter for this many sites, instead of a set. None for a set.
+        self.seen = SeenSet(bloom_capacity)                                     # Every site that has been queued, in canonical form. Sites are only queued once.
+        self.scorers = scorers                                                  # FrontierScorers to visit the best sites first. None to visit them in the order they are found.
+        self.frontier = self.new_frontier()                                     # Sites yet to visit. Starts with seed
+        if starting_site is not None:                                           # None to start empty (see ShardCrawler)
+            self.frontier.push(starting_site)
+        self.current_target = None                                              # Current target site
+        self.num_to_visit = num_to_visit                                        # Total number of sites that should be visited
+        self.secured = secured                                                  # True if sites that are NOT secured should be visited
+        self.no_goes = no_goes                                                  # List of sites that should NOT be visited
+        self.url_filter = UrlFilter(no_goes, secured)                           # Compiled from no_goes and secured. Links are filtered before they are queued.
+        self.cusHeaders = {'User-Agent':'CustomCrawler(+https://www.mycustomcrawlerexplanations.com)'}          #identifying string passed to server when HTTP request (in header) is made.
+        self.records = CrawlRecords()                                           # Information on all sites the program TRIES to visit. Read it through sites_dict.
+        self.counter_attempts = 0                                               # Counter to give the current progress of the search.  Gives the number of all sites ATTEMPTED.
+        self.counter_total = 0                                                  # Counter to give progress of search. Tracks only sites that have been visited.
+        self.crawl_delay = 15                                                   # Standard number of seconds to wait between requests to a host, if its robots file gives no Crawl-delay. Adapted per host by self.rates.
+        self.robots_cache = RobotsCache()                                       # Compiled robots.txt rules for each host we have seen
+        self.terms_cache = TermsCache()                                         # Outcome of ToS_check for each host we have seen
+        self.scheduler = HostScheduler()                                        # When each host may next be requested
+        self.rates = RateController()                                           # Adaptive crawl-delay of each host
+        self.metrics = Metrics()                                                # Counters and stage timings of the crawl
+        self.dns = DnsCache(metrics = self.metrics)                             # Host name lookups, prefetched as links are queued
+        self.sessions = SessionPool(self.cusHeaders, metrics = self.metrics, dns = self.dns)    # Kept-alive connections, one session per host
+        self.max_links = None                                                   # Stop reading a page after this many links. None to read all of it.
+        self.max_bytes = 2 * 2**20                                              # Stop reading a page (or terms page) after this many bytes. Larger Content-Lengths aren't read at all.
+        self.max_robots_bytes = 500 * 2**10                                     # Most of a robots file to read. Google reads 500 KiB.
+        self.http_cache = None                                                  # ResponseCache for conditional requests on a recrawl, if any
+        if policy is None:                                                      # Allow every host. Nothing is asked at the keyboard unless an InteractivePolicy is given.
+            policy = RulePolicy()
+        self.policy = policy                                                    # CrawlPolicy, decides whether robots comments/ToS allow a host to be crawled
+        self.store = None                                                       # CrawlStore the state is checkpointed to, if any
+        self.exporters = []                                                     # GraphExporters the network is written to as it is crawled
+        self.exported_nodes = 0                                                 # Number of URLs (nodes) already given to the exporters
+
+    def new_frontier(self):
+        """
+        Function to make an empty frontier on self.seen: a PriorityFrontier if there are scorers, a Frontier otherwise.
+        Output: Frontier
+        """
+        if self.scorers is None:
+            return Frontier(self.seen)
+        return PriorityFrontier(self.seen, self.scorers)
+
+    @property
+    def sites_dict(self):
+        """
+        Dictionary that gives sites, with information. Will include all sites the program TRIES to visit.
+        A read-only view: each entry is built from self.records when it is looked up.
+        """
+        return SitesDictView(self.records)
+
+    @property
+    def sites_visited(self):
+        """
+        List of sites that have been visited, in order. Built from self.records.
+        """
+        return [self.records.url(attempt) for attempt in range(1, len(self.records) + 1) if self.records.visited(attempt)]
+
+    def host_delay(self, root_url):
+        """
+        Function to get the crawl-delay for a host from the RateController. It starts at the Crawl-delay from the robots file
+        if there is one (and never goes below it), at our standard delay otherwise, and adapts to how the host responds.
+        Input: root_url (str), eg. 'https://www.abcd.com'
+        Output: (float), seconds
+        """
+        rules = self.robots_cache.get(root_url)
+        robots_delay = rules.crawl_delay if rules is not None else None
+        return self.rates.delay(hostOfUrl(root_url, with_port = True), robots_delay, self.crawl_delay)
+
+    def fetch(self, url, stream = False, partial = False):
+        """
+        Function to make a polite GET request. Waits until the crawl-delay of the host has passed since our last request to it.
+        Requests to other hosts don't have to wait.
+        With an http_cache, a url we have a response for is requested conditionally, and a 304 Not Modified gives the cached
+        response instead (with .from_cache set, and .cached_links if the links of the page were stored too).
+        A response that isn't streamed is stored straight away. A streamed one has to be stored by the caller, once it is read.
+        Inputs: url (str)
+                stream (Bool), if True the body is only downloaded as it is read (see responseChunks)
+                partial (Bool), if True a cached body that was only read in part will do (see ResponseCache.store)
+        Output: requests.response object
+        """
+        root_url, _ = splitRootUrl(url)
+        host = hostOfUrl(root_url, with_port = True)
+        cached = None
+        if self.http_cache is not None:
+            cached = self.http_cache.lookup(url, partial)
+        waited = self.scheduler.wait(host, self.host_delay(root_url))
+        self.metrics.observe_stage('politeness', waited)
+        try:
+            response = self.sessions.get(url, stream = stream, headers = cached and ResponseCache.conditional_headers(cached))
+        except requests.RequestException as fetch_error:
+            self.metrics.inc('crawler_request_errors_total', label = type(fetch_error).__name__)
+            if isinstance(fetch_error, (requests.Timeout, requests.ConnectionError)):
+                self.rates.on_error(host)                                       # Back off, the host may be overloaded
+            raise
+        self.metrics.inc('crawler_responses_total', label = str(response.status_code)[0] + 'xx')
+        # 429s and 5xxs make us back off from the host (and wait for Retry-After), quick responses let us speed up to the floor.
+        retry_after = self.rates.on_response(host, response.status_code, response.elapsed.total_seconds(), response.headers.get('Retry-After'))
+        if retry_after > 0:
+            logger.info('Waiting %.0f s (Retry-After) before the next request to %s', retry_after, host)
+            self.scheduler.hold(host, retry_after)
+        if cached is not None and response.status_code == 304:
+            self.metrics.inc('crawler_cache_hits_total')
+            return self.http_cache.cached_response(url, cached, response)
+        if self.http_cache is not None and not stream:
+            self.http_cache.store(url, response, response.content)
+        return response
+
+    def read_text(self, url, response, max_bytes):
+        """
+        Function to read the body of a streamed response as text, up to max_bytes, and keep it in the http_cache (if any).
+        Inputs: url (str), the url that was requested
+                response (requests.response object), requested with stream = True. It is closed here.
+                max_bytes (int)
+        Output: (str), the body
+        """
+        text = ''.join(responseChunks(response, max_bytes = max_bytes))
+        if response.truncated:
+            self.metrics.inc('crawler_bodies_skipped_total', label = 'truncated')
+        if self.http_cache is not None and not getattr(response, 'from_cache', False):
+            self.http_cache.store(url, response, text, complete = not response.truncated)
+        response.close()
+        return text
+
+    def robots_check(self, target = None):                                      # Function that examines robots.txt file. Made a function to make code cleaner.
+        """
+        Function to check whether we are prohibited from visiting a site based on /robots.txt restrictions.
+        The rules for each host are downloaded and compiled once, then kept in self.robots_cache,
+        so after the first visit to a host this is an in-memory lookup.
+        Inputs: object of class Crawler. Need: robots_cache
+                target (str), the url to check. Defaults to current_target.
+        Outputs: crawlable (Bool), True if we can crawl. False otherwise.
+                 str_status (int), For the dictionary
+        """
+        if target is None:
+            target = self.current_target
+
+        # 1. Get root of site url, and the extension of the site to visit.
+        root_url, tExtension = splitRootUrl(target)
+
+        # 2. Look the host up in the cache. Only go to the network if we have no (fresh) rules for it.
+        rules = self.robots_cache.get(root_url)
+        if rules is None:
+            rules = self.fetch_robots(root_url)
+
+        # 3. Check the URL against the compiled rules.
+        crawlable = rules.is_allowed(tExtension)
+        return crawlable, rules.status                                          # True: allowed, False: prohibited
+
+    def robots_allowed(self, urls):
+        """
+        Function to check many sites (eg. all the links of a page) against the robots rules we already have (see filter_urls).
+        The sites are grouped by host, so the rules of each host are looked up once and the paths checked in one batch.
+        Hosts whose rules haven't been downloaded yet give None: they are checked when a site on them is visited.
+        Input: urls (list of str)
+        Output: (list), True (allowed), False (prohibited) or None (not known yet), for each url.
+        """
+        decisions = [None] * len(urls)
+        by_host = {}                                                            # root_url: (positions in urls, paths)
+        for position, url in enumerate(urls):
+            if '//' not in url:                                                 # eg. 'mailto:', no robots file to go by
+                continue
+            root_url, tExtension = splitRootUrl(url)
+            positions, paths = by_host.setdefault(root_url, ([], []))
+            positions.append(position)
+            paths.append(tExtension)
+        for root_url, (positions, paths) in by_host.items():
+            rules = self.robots_cache.get(root_url)
+            if rules is not None:
+                for position, allowed in zip(positions, rules.allowed_paths(paths)):
+                    decisions[position] = allowed
+        return decisions
+
+    def fetch_robots(self, root_url):
+        """
+        Function to download, parse and cache the /robots.txt file of a host.
+        Inputs: root_url (str), eg. 'https://www.abcd.com'
+        Output: rules (RobotsRules), the compiled rules. These are also stored in self.robots_cache.
+        """
+        # 1. Try to 'get' the robots file. Interpret status_code accordingly
+        robots_url = root_url + '/robots.txt'
+        robots_req_obj = self.fetch(robots_url, stream = True)
+        str_status = getSiteStatus(robots_req_obj, robots_url)
+
+        # 2. A 4xx means there is no robots file: full crawling can proceed. Anything else other than a 2xx means we don't crawl
+        # the host (see RobotsRules). Keep that in the cache too, so we don't ask again for every URL.
+        if str_status[0] != '2':
+            rules = RobotsRules(int(str_status))
+            if not rules.unreachable:
+                logger.info('No robots file (%s). Assuming no robots file exists, full crawling can proceed, url: %s', str_status, robots_url)
+            robots_req_obj.close()
+            self.robots_cache.put(root_url, rules, robots_req_obj.headers)
+            return rules
+
+        # 3. Parse the file into a compiled rule set. Anything past max_robots_bytes is ignored, as Google does.
+        # Reading it CLOSEs the object: the connxn goes back to the pool, and is closed if the host stays idle (so we don't stress it)
+        rules = parseRobots(self.read_text(robots_url, robots_req_obj, self.max_robots_bytes), int(str_status))
+
+        # 5. Comments in the /robots.txt file. The policy decides once per host, the answer is cached with the rules.
+        if not self.policy.robots_ok(hostOfUrl(root_url), rules.comments):
+            rules.refused = True
+
+        self.robots_cache.put(root_url, rules, robots_req_obj.headers)
+        return rules
+
+    def ToS_check(self, target = None):                                         # Function that examines the terms of service. Sees if we can crawl
+        """
+        Function to check the Terms of Service on the webpage.
+        Check both the root site and the ToS page, if they can be found.
+        The outcome is kept for each host in self.terms_cache, so the pages are only read once per host (and again when the
+        outcome expires, see TermsCache). The policy still decides on the cached terms, so a changed policy applies to them.
+        Inputs: crawler instance.
+                target (str), the url we want to visit. Defaults to current_target.
+        Outputs: okContinue (Y/N) (str): can the crawl progress or are we prohibited?
+                 ToS_status (int): status code of request [either for the Homepage or T&C's page]
+        """
+        if target is None:
+            target = self.current_target
+
+        # 1. Get root of site url.
+        root_url, _ = splitRootUrl(target)                                      # 'https://www.abcd.com'
+
+        # 2. A host we have checked already.
+        cached = self.terms_cache.get(root_url)
+        if cached is not None and cached[4] > time.time():
+            if cached[2] is None:                                               # No terms page, or it couldn't be read: nothing for the policy to decide on
+                return cached[0], cached[1]
+            if cached[5] is not None:
+                # The verdict in the cache may come from the policy of an earlier crawl. tos_ok is asked once per version of the terms.
+                okContinue = 'Y' if self.policy.tos_ok(hostOfUrl(root_url), cached[5], cached[3]) else 'N'
+                if okContinue != cached[0]:
+                    cached[0] = okContinue
+                    self.terms_cache.put(root_url, okContinue, cached[1], cached[2], cached[3], cached[5])
+                return okContinue, cached[1]
+        # The outcome has expired (or its paragraphs weren't kept). If the terms page is still there, reading it again is enough.
+        if cached is not None and cached[2] is not None:
+            outcome = self.read_terms(root_url, cached[2], cached)
+            if outcome is not None:
+                return outcome
+
+        # 3. Visit root site, and look for the terms page on it.
+        ToS_link_full, root_status = self.find_terms(root_url)
+        if root_status[0] != '2':
+            okContinue = 'N'
+            logger.warning('Problem establishing connxn with Homepage, url: %s', root_url)
+            self.terms_cache.put(root_url, okContinue, int(root_status))
+            return okContinue, int(root_status)
+        if ToS_link_full is None:                                               # If we can't find a ToS easily, assume we go ahead with the crawl.
+            okContinue = 'Y'
+            self.terms_cache.put(root_url, okContinue, int(root_status))      # If there is no ToS page, the homepage status is reported.
+            return okContinue, int(root_status)
+
+        # 4. Head to the 'terms' page and search for 'robots'/'crawler'/'spider'
+        return self.read_terms(root_url, ToS_link_full)
+
+    def find_terms(self, root_url):
+        """
+        Function to find the terms of service page of a host, from the links on its homepage.
+        Input: root_url (str), eg. 'https://www.abcd.com'
+        Outputs: ToS_link_full (str), absolute url of the terms page. None if there is no link to one.
+                 root_status (str), status code of the homepage
+        """
+        # fetch waits for the crawl-delay, since we have just visited the robots page.
+        # Only the start of the homepage is read, so a cached start of it will do.
+        root_req_obj = self.fetch(root_url, stream = True, partial = True)
+        root_status = getSiteStatus(root_req_obj, root_url)
+        if root_status[0] != '2':
+            root_req_obj.close()
+            return None, root_status
+        if bodyProblem(root_req_obj) is not None:                               # Not HTML, so no links to look at
+            root_req_obj.close()
+            return None, root_status
+
+        # Search the links on the homepage, as it arrives, for any mention of 'terms'
+        # The first such link is used (pass: multiple 'terms' links.), we stop reading the homepage there.
+        ToS_link = ''
+        homepage_links = LinkExtractor(with_text = True)
+        homepage_chunks = TimedIterator(responseChunks(root_req_obj, max_bytes = self.max_bytes), keep = self.http_cache is not None)
+        for href, link_text in iterLinks(homepage_chunks, extractor = homepage_links):
+            if 'terms' in link_text or 'Terms' in link_text:
+                ToS_link = href
+                break
+        if self.http_cache is not None and not getattr(root_req_obj, 'from_cache', False):
+            # The page is the same until the ETag changes, so the part we read gives the same ToS link next time.
+            self.http_cache.store(root_url, root_req_obj, ''.join(homepage_chunks.kept), complete = ToS_link == '' and not root_req_obj.truncated)
+        # CLOSE connxn (back to the pool, closed if the host stays idle) so that we don't stress server.
+        root_req_obj.close()
+
+        if (ToS_link == '') or (ToS_link == None) or ToS_link.startswith('#'):
+            return None, root_status
+        # Some URLs are relative, resolveLinks sorts these out. A malformed link is as good as none.
+        ToS_links = resolveLinks(root_url + '/', [ToS_link], homepage_links.base_href)
+        return (ToS_links[0] if ToS_links else None), root_status
+
+    def read_terms(self, root_url, ToS_link_full, cached = None):
+        """
+        Function to read the terms of service page of a host and decide whether they allow the crawl. The outcome is stored
+        in self.terms_cache, with a hash of the page as its version.
+        Inputs: root_url (str), eg. 'https://www.abcd.com'
+                ToS_link_full (str), the terms page
+                cached (list), the expired entry of the terms cache, if we are checking it again.
+        Outputs: okContinue (Y/N) (str), and ToS_status (int), as for ToS_check.
+                 None if we were checking a cached entry, and the page couldn't be read (it may have moved).
+        """
+        terms_req_obj = self.fetch(ToS_link_full, stream = True)
+        tos_status = getSiteStatus(terms_req_obj, ToS_link_full)
+        if tos_status[0] != '2':
+            terms_req_obj.close()
+            if cached is not None:
+                return None
+            okContinue = 'N'
+            logger.warning('Problem establishing connxn with ToS page, url: %s', ToS_link_full)
+            self.terms_cache.put(root_url, okContinue, int(tos_status))
+            return okContinue, int(tos_status)
+
+        # Reading it CLOSEs the connxn (back to the pool, closed if the host stays idle) - so that we dont stress the server
+        skip_reason = bodyProblem(terms_req_obj, self.max_bytes, HTML_TYPES + ('text/',))
+        if skip_reason is None:
+            terms_text = self.read_text(ToS_link_full, terms_req_obj, self.max_bytes)
+        else:                                                                   # A PDF, a video, etc.: there is no text we can read
+            self.metrics.inc('crawler_bodies_skipped_total', label = skip_reason)
+            terms_req_obj.close()
+            terms_text = ''
+
+        version = hashlib.blake2b(terms_text.encode('utf-8'), digest_size = 16).hexdigest()
+        # The policy decides, once per host and version of the terms, whether the terms allow the crawl. It is asked again
+        # when the terms haven't changed, since it may have (eg. a new policy file for this crawl).
+        tos_paragraphs = relevantTerms(terms_text)
+        if self.policy.tos_ok(hostOfUrl(root_url), tos_paragraphs, version):
+            okContinue = 'Y'
+        else:
+            okContinue = 'N'
+        self.terms_cache.put(root_url, okContinue, int(tos_status), ToS_link_full, version, tos_paragraphs)
+        return okContinue, int(tos_status)
+
+    def screen(self, target):
+        """
+        Function to check if we WANT to visit a site (if not, we can record it as an ending stub in the diagram).
+        Input: target (str), the url
+        Output: site_record (dict) for sites_dict if the site should be skipped. None if we can go ahead.
+        """
+        # What shall we exclude? (1) Sites we just don't want to visit, (2) schemes we don't crawl ('mailto', 'ftp', 'http' if
+        # only secured sites are wanted) or (3) None sites. Links were filtered like this before they were queued (see enqueue),
+        # so this only catches the seed and sites queued by an older version. Links the robots rules prohibit were dropped
+        # then too, if the rules of their host were cached; visit checks the rest.
+        # Repeats don't get this far either: the frontier only takes each site once.
+        if target is None or self.url_filter.reason(target) is not None:
+            return siteRecord(target, nogo = True)
+        return None
+
+    def visit(self, target):
+        """
+        Function to visit a single site: check the robots file and the ToS, then download the site and get its links.
+        It doesn't change the crawl state (that is done by record), so sites on different hosts can be visited at the same time.
+        Input: target (str), the url to visit
+        Outputs: site_record (dict), the entry for sites_dict
+                 main_link_list (list of str), the absolute links on the site. None if we didn't get the site.
+        """
+        # 4. Check if we are PERMITTED to visit it (robots file)
+        # Returns a bool TRUE if we can crawl
+        with self.metrics.stage('robots'):
+            m_crawlable, robot_status = self.robots_check(target)
+        if not m_crawlable:
+            return siteRecord(target, robots = True), None
+
+        # 5. Check if the TERMS allow us to access the desired site
+        # Since we are not completely probited from crawling, it stands to reason that we can visit the Homepage -> T&C's to check
+        with self.metrics.stage('tos'):
+            ToS_outcome, tos_code = self.ToS_check(target)
+        if ToS_outcome != 'Y':
+            return siteRecord(target, ToS = True), None
+
+        # 6. Visit the desired site and extract content
+        # 6.1. Requests module. fetch waits for the crawl-delay and passes our custom UA string
+        main_siteContentStuff = self.fetch(target, stream = True)
+        main_code = getSiteStatus(main_siteContentStuff, target)
+        if main_code[0] != '2':
+            main_siteContentStuff.close()
+            return siteRecord(target, status = int(main_code)), None
+
+        # 6.2. Get Links, as the page arrives. The time waiting for the body is download time, the rest is parse time.
+        # Only HTML is read, and no more than max_bytes of it. If the page hasn't changed since it was cached (304), the links found on it last time are used.
+        main_link_list = getattr(main_siteContentStuff, 'cached_links', None)
+        skip_reason = bodyProblem(main_siteContentStuff, self.max_bytes) if main_link_list is None else None
+        if skip_reason is not None:
+            # Not HTML (a PDF, a video, etc.), or too large: the site has no links we can read. The body isn't downloaded.
+            self.metrics.inc('crawler_bodies_skipped_total', label = skip_reason)
+            main_link_list = []
+        elif main_link_list is None:
+            parse_start = time.perf_counter()
+            page_links = LinkExtractor(self.max_links)
+            body_chunks = TimedIterator(responseChunks(main_siteContentStuff, max_bytes = self.max_bytes), keep = self.http_cache is not None)
+            hrefs = list(iterLinks(body_chunks, extractor = page_links))
+            if main_siteContentStuff.truncated:
+                self.metrics.inc('crawler_bodies_skipped_total', label = 'truncated')
+            self.metrics.observe_stage('download', main_siteContentStuff.elapsed.total_seconds() + body_chunks.elapsed)
+            self.metrics.observe_stage('parse', time.perf_counter() - parse_start - body_chunks.elapsed)
+            # Relative links are resolved against the page (or its <base href>), and every link is put in canonical form.
+            with self.metrics.stage('resolve'):
+                main_link_list = resolveLinks(target, hrefs, page_links.base_href)
+            if self.http_cache is not None:
+                self.http_cache.store(target, main_siteContentStuff, ''.join(body_chunks.kept), main_link_list,
+                                      complete = not (page_links.done or main_siteContentStuff.truncated))
+        else:
+            self.metrics.observe_stage('download', main_siteContentStuff.elapsed.total_seconds())
+        self.metrics.inc('crawler_links_total', len(main_link_list))
+        # Now every link that is added will have a full, absolute web address.
+
+        site_record = siteRecord(target,
+                                 links = main_link_list,
+                                 status = main_siteContentStuff.status_code,
+                                 redirect = main_siteContentStuff.is_redirect,
+                                 duration = (main_siteContentStuff.elapsed).total_seconds())
+
+        # 7. Close connection with site (done for each as soon as we are done with the command). The session pool closes it once the host is idle.
+        main_siteContentStuff.close()
+        return site_record, main_link_list
+
+    def run(self, max_hosts = 8):
+        """
+        Function to crawl until num_to_visit sites have been visited, or there is nothing left to visit.
+        Blocks until then. Call close (and close_exporters) when done with the crawler.
+        Input: max_hosts (int), the number of hosts crawled at the same time
+        Output: sites_dict
+        """
+        return asyncio.run(AsyncCrawlEngine(self, max_hosts).run())
+
+    def results(self, max_hosts = 8):
+        """
+        Function to crawl like run, from a running event loop, giving each attempt as soon as it is recorded:
+            async for site_record in crawler.results(): ...
+        Input: max_hosts (int)
+        Output: asynchronous iterator of site_record (dict), see AsyncCrawlEngine.results
+        """
+        return AsyncCrawlEngine(self, max_hosts).results()
+
+    def record(self, target, site_record, links):
+        """
+        Function to store the outcome of an attempt in sites_dict, and add the links of a visited site to the sites to visit.
+        Inputs: target (str), the url
+                site_record (dict), from screen or visit
+                links (list of str), the links on the site. None if the site wasn't visited.
+        """
+        self.counter_attempts = self.records.append(site_record)
+        self.metrics.inc('crawler_sites_total', label = siteOutcome(site_record))
+        if links is not None:
+            # Add the links into a store. Sites already seen are dropped here.
+            # This comes before the record is checkpointed: the store writes in order, so a record on disk always has
+            # its links queued on disk too, whichever batch it lands in.
+            with self.metrics.stage('enqueue'):
+                added = self.enqueue(links, target)
+            self.metrics.inc('crawler_enqueued_total', added)
+            self.counter_total += 1
+        if self.store is not None:
+            self.store.log_record(self.counter_attempts, site_record)
+        if self.exporters:
+            self.export(self.counter_attempts)
+
+    def filter_urls(self, urls):
+        """
+        Function to drop the sites we don't want to visit (see UrlFilter), and the sites the robots rules we already have
+        prohibit, before they take up room in the frontier.
+        Input: urls (iterable of str)
+        Output: (list of str), the sites that may be visited
+        """
+        kept = []
+        skipped = {}                                                            # reason: count
+        reason = self.url_filter.reason
+        for url in urls:
+            skip_reason = reason(url)
+            if skip_reason is None:
+                kept.append(url)
+            else:
+                skipped[skip_reason] = skipped.get(skip_reason, 0) + 1
+        # Hosts without cached rules are kept: they are checked when a site on them is visited.
+        decisions = self.robots_allowed(kept)
+        if False in decisions:
+            skipped['robots'] = decisions.count(False)
+            kept = [url for url, allowed in zip(kept, decisions) if allowed is not False]
+        for skip_reason, count in skipped.items():
+            self.metrics.inc('crawler_links_filtered_total', count, label = skip_reason)
+        return kept
+
+    def enqueue(self, urls, source = None):
+        """
+        Function to add sites to the frontier, and checkpoint the ones that are new. Sites we don't want to visit are dropped.
+        Inputs: urls (iterable of str)
+                source (str), the site they were found on. None for seeds.
+        Output: (int), the number of sites added.
+        """
+        added = 0
+        new_hosts = set()
+        for url in self.filter_urls(urls):
+            url = self.frontier.push(url, source)
+            if url is not None:
+                added += 1
+                new_hosts.add(hostOfUrl(url))
+                if self.store is not None:
+                    self.store.log_queued(url)
+        if new_hosts:
+            self.dns.prefetch(new_hosts)                                        # Resolved in the background, before they are visited
+        return added
+
+    def export(self, attempt):
+        """
+        Function to give a new record to the exporters: the URLs (nodes) that are new since the last record, then its links (edges).
+        Input: attempt (int), the number of the record
+        """
+        url_table = self.records.urls
+        for url_id in range(self.exported_nodes, len(url_table)):
+            url = url_table.url(url_id)
+            for exporter in self.exporters:
+                exporter.add_node(url_id, url)
+        self.exported_nodes = len(url_table)
+
+        link_ids = self.records.link_ids(attempt)
+        if link_ids is not None:
+            source_id = self.records.url_ids[attempt - 1]
+            for exporter in self.exporters:
+                exporter.add_edges(source_id, link_ids, url_table)
+
+    def add_exporter(self, exporter):
+        """
+        Function to start writing the network to a GraphExporter. The records so far (eg. after a resume) are written straight away.
+        Input: exporter (GraphExporter)
+        """
+        url_table = self.records.urls
+        for url_id in range(len(url_table)):
+            exporter.add_node(url_id, url_table.url(url_id))
+        for attempt in range(1, len(self.records) + 1):
+            link_ids = self.records.link_ids(attempt)
+            if link_ids is not None:
+                exporter.add_edges(self.records.url_ids[attempt - 1], link_ids, url_table)
+        self.exporters.append(exporter)
+        self.exported_nodes = len(url_table)
+
+    def close(self):
+        """
+        Function to close all connections to servers, the response cache and the terms cache.
+        """
+        self.sessions.close()
+        self.dns.close()
+        self.terms_cache.close()
+        if self.http_cache is not None:
+            self.http_cache.close()
+
+    def close_exporters(self):
+        """
+        Function to finish the files of all the exporters.
+        """
+        for exporter in self.exporters:
+            exporter.close()
+        self.exporters = []
+
+    def attach_store(self, store):
+        """
+        Function to start checkpointing the crawl state to a CrawlStore. The sites already in the frontier are written straight away.
+        Input: store (CrawlStore)
+        """
+        self.store = store
+        for url in self.frontier:
+            store.log_queued(url)
+
+    def restore(self, store):
+        """
+        Function to replace the crawl state with the last checkpoint in a CrawlStore, and carry on checkpointing to it.
+        Sites that were queued but never recorded go back in the frontier.
+        Input: store (CrawlStore)
+        """
+        queued, records = store.load_state()
+        self.seen = SeenSet(self.seen_capacity)
+        self.frontier = self.new_frontier()
+        self.records = CrawlRecords()
+        self.counter_attempts = 0
+        self.counter_total = 0
+
+        attempted = set()
+        for attempt, site_record in records:
+            self.counter_attempts = self.records.append(site_record)
+            attempted.add(site_record['url'])
+            if site_record['links'] is not None:
+                self.counter_total += 1
+        for url in queued:
+            if url in attempted:
+                self.seen.add(url)
+            else:
+                self.frontier.push(url)
+        self.store = store
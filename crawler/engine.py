@@ -0,0 +1,172 @@
+# Asyncio crawl engine.
+
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .records import siteRecord
+from .urls import hostOfUrl, splitRootUrl
+
+logger = logging.getLogger(__name__)                                            # Diagnostics. main() shows them on the console.
+
+class AsyncCrawlEngine():
+    """
+    Crawls several hosts at the same time.
+    Each host has at most one site being visited (so one connection) at a time, and the HostScheduler of the crawler
+    keeps the crawl-delay between requests to the same host. Sites on other hosts don't have to wait for it.
+    The blocking work for a site (Crawler.visit) is done in a thread pool, the crawl state is only changed on the event loop.
+    """
+
+    def __init__(self, crawler, max_hosts = 8):
+        self.crawler = crawler                                                  # Crawler instance, holds the crawl state
+        self.max_hosts = max_hosts                                              # Number of hosts being crawled at the same time
+        self.busy_hosts = set()                                                 # Hosts with a site being visited right now
+        self.pending = OrderedDict()                                            # host: deque of sites put aside until the host is free
+        self.poll_interval = None                                               # Seconds between calls to poll while sites are being visited. None to only wake up when a site is done.
+        self.on_record = None                                                   # Function called with each site_record once it is recorded, if any (see results)
+
+    def claim(self, running):
+        """
+        Function to check whether another site may be started without going over the number of sites to visit.
+        Input: running (int), the number of sites being visited right now
+        Output: (Bool)
+        """
+        return self.crawler.counter_total + running < self.crawler.num_to_visit
+
+    def release(self):
+        """
+        Function to give back a claim that wasn't used: no site could be started, or the site wasn't visited.
+        Nothing to do here, counter_total only counts sites that were visited.
+        """
+        pass
+
+    def poll(self):
+        """
+        Function to take in sites to visit that come from outside the crawler. Nothing here, see ShardEngine.
+        """
+        pass
+
+    def finished(self):
+        """
+        Function called when no site is being visited and no site can be started.
+        Output: (Bool), True to stop. False to wait poll_interval seconds and try again.
+        """
+        return True
+
+    def record(self, target, site_record, links):
+        """
+        Function to record the outcome of an attempt with the crawler, and pass it on to on_record.
+        Inputs: as for Crawler.record
+        """
+        self.crawler.record(target, site_record, links)
+        if self.on_record is not None:
+            self.on_record(site_record)
+
+    def next_target(self):
+        """
+        Function to choose the next site to visit, on a host that is free.
+        Sites we don't want to visit are recorded straight away. Sites on busy hosts are put aside for later.
+        Outputs: target (str), host (str). (None, None) if nothing can be started right now.
+        """
+        while True:
+            target = None
+            # 1. Sites that were put aside, whose host is now free.
+            for host in self.pending:
+                if host not in self.busy_hosts:
+                    target = self.pending[host].popleft()
+                    if not self.pending[host]:
+                        del self.pending[host]
+                    break
+            # 2. Otherwise the next site to visit.
+            if target is None:
+                if not self.crawler.frontier:
+                    return None, None
+                target = self.crawler.frontier.pop(self.busy_hosts)               # A PriorityFrontier keeps the sites of busy hosts
+                if target is None:
+                    return None, None
+
+            # 3. Check if we WANT to visit it.
+            skip_record = self.crawler.screen(target)
+            if skip_record is not None:
+                self.record(target, skip_record, None)
+                continue
+
+            host = hostOfUrl(splitRootUrl(target)[0], with_port = True)
+            if host in self.busy_hosts:
+                self.pending.setdefault(host, deque()).append(target)
+                continue
+            return target, host
+
+    async def run(self):
+        """
+        Function to crawl until num_to_visit sites have been visited, or there is nothing left to visit.
+        Output: sites_dict of the crawler.
+        """
+        loop = asyncio.get_running_loop()
+        tasks = {}                                                              # future: (target, host)
+        with ThreadPoolExecutor(max_workers = self.max_hosts) as executor:
+            while True:
+                self.poll()
+                # 1. Start sites on free hosts, without going over the number of sites to visit.
+                while len(tasks) < self.max_hosts and self.claim(len(tasks)):
+                    target, host = self.next_target()
+                    if target is None:
+                        self.release()
+                        break
+                    self.busy_hosts.add(host)
+                    self.crawler.frontier.started(target)
+                    tasks[loop.run_in_executor(executor, self.crawler.metrics.profiled, self.crawler.visit, target)] = (target, host)
+
+                if not tasks:                                                   # Finished, or nothing left to visit (for now).
+                    if self.finished():
+                        break
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                # 2. Record each site as soon as it is done. That frees its host for the next site.
+                done, _ = await asyncio.wait(tasks, timeout = self.poll_interval, return_when = asyncio.FIRST_COMPLETED)
+                for task in done:
+                    target, host = tasks.pop(task)
+                    self.busy_hosts.discard(host)
+                    try:
+                        site_record, links = task.result()
+                    except requests.RequestException as fetch_error:
+                        logger.warning('Problem establishing connxn, url: %s (%s)', target, fetch_error)
+                        site_record, links = siteRecord(target), None
+                    except Exception:                                           # Eg. a URL that can't be parsed, or a cache error. A failed site, the crawl goes on.
+                        logger.exception('Problem visiting site, url: %s', target)
+                        site_record, links = siteRecord(target), None
+                    self.record(target, site_record, links)
+                    if links is None:
+                        self.release()
+        return self.crawler.sites_dict
+
+    async def results(self):
+        """
+        Function to crawl like run, giving each attempt as soon as it is recorded:
+            async for site_record in engine.results(): ...
+        Leaving the loop early stops the crawl, once the sites being visited are done.
+        Output: asynchronous iterator of site_record (dict), in the format of sites_dict
+        """
+        records = asyncio.Queue()
+        self.on_record = records.put_nowait
+        crawl = asyncio.ensure_future(self.run())
+        crawl.add_done_callback(lambda _: records.put_nowait(None))            # Wakes up the loop below at the end, or on an error
+        try:
+            while True:
+                site_record = await records.get()
+                if site_record is None:
+                    break
+                yield site_record
+            await crawl                                                         # Raises what stopped the crawl, if anything
+        finally:
+            self.on_record = None
+            if not crawl.done():
+                crawl.cancel()
+                try:
+                    await crawl
+                except asyncio.CancelledError:
+                    pass
@@ -0,0 +1,420 @@
+# Frontier and seen set.
+
+import hashlib
+import heapq
+import math
+from collections import OrderedDict, deque
+
+from .urls import canonicaliseUrl, hostOfUrl
+
+class BloomFilter():
+    """
+    Fixed-size set of strings that may give false positives (never false negatives).
+    Uses far less memory than a set for very large crawls, eg. ~1.8 MB for a million URLs at a 0.1% error rate.
+    """
+
+    def __init__(self, capacity, error_rate = 0.001):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0                                                          # Number of strings added
+
+    def positions(self, key):
+        """
+        Function to get the bit positions of a string (double hashing of one blake2b digest).
+        Input: key (str)
+        Output: (list of int)
+        """
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size = 16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        """
+        Function to add a string.
+        Input: key (str)
+        Output: (Bool), True if it wasn't (as far as we can tell) in the filter already.
+        """
+        new = False
+        for pos in self.positions(key):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= (1 << bit)
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, key):
+        for pos in self.positions(key):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+class SeenSet():
+    """
+    The canonical URLs that have been queued or visited.
+    Backed by a set, or by a BloomFilter if bloom_capacity is given (a few URLs may then be wrongly treated as seen).
+    """
+
+    def __init__(self, bloom_capacity = None, error_rate = 0.001):
+        if bloom_capacity:
+            self.urls = BloomFilter(bloom_capacity, error_rate)
+        else:
+            self.urls = set()
+
+    def add(self, url):
+        """
+        Function to add a URL.
+        Input: url (str)
+        Output: (str), the canonical URL if it hadn't been seen before. None if it had, or if it is malformed.
+        """
+        try:
+            url = canonicaliseUrl(url)
+        except ValueError:
+            return None
+        if url in self.urls:
+            return None
+        self.urls.add(url)
+        return url
+
+    def __contains__(self, url):
+        try:
+            return canonicaliseUrl(url) in self.urls
+        except ValueError:
+            return False
+
+    def __len__(self):
+        return len(self.urls)
+
+class Frontier():
+    """
+    The sites yet to visit, first in first out. Every URL is put in canonical form and checked against the seen set when it is added,
+    so each site is only ever queued once. Adding and taking sites are O(1).
+    """
+
+    def __init__(self, seen = None):
+        if seen is None:
+            seen = SeenSet()
+        self.seen = seen                                                        # SeenSet shared with the crawler
+        self.queue = deque()                                                    # Normalised URLs, oldest first
+
+    def push(self, url, source = None):
+        """
+        Function to add a site, unless it has been seen already.
+        Inputs: url (str)
+                source (str), the site the link was found on. Not needed here, see PriorityFrontier.
+        Output: (str), the canonical URL if it was added. None if it had been seen already.
+        """
+        url = self.seen.add(url)
+        if url is None:
+            return None
+        self.queue.append(url)
+        return url
+
+    def extend(self, urls, source = None):
+        """
+        Function to add several sites.
+        Inputs: urls (iterable of str)
+                source (str), the site they were found on
+        Output: (int), the number that were added.
+        """
+        added = 0
+        for url in urls:
+            if self.push(url, source) is not None:
+                added += 1
+        return added
+
+    def pop(self, busy = ()):
+        """
+        Function to take the next site. Raises IndexError if there is none.
+        Input: busy (set of str), hosts being visited. Not needed here, see PriorityFrontier.
+        Output: (str), the canonical URL
+        """
+        return self.queue.popleft()
+
+    def started(self, url):
+        """
+        Function called when a site taken with pop is visited. Nothing to do here, see PriorityFrontier.
+        Input: url (str)
+        """
+        pass
+
+    def __len__(self):
+        return len(self.queue)
+
+    def __iter__(self):
+        return iter(self.queue)
+
+class FrontierScorer():
+    """
+    Scores the queued sites of a PriorityFrontier: the sites with the highest score are visited first.
+    A score has two parts, added up over all scorers of the frontier: a part for the site itself (site_score), and a part
+    for its host (host_score). The host part may only change for a host when one of its sites is taken.
+    """
+
+    name = None                                                                 # Name in SCORERS, for parseScorers and to_spec
+
+    def __init__(self, weight = 1.0):
+        self.weight = weight
+
+    def to_spec(self):
+        """
+        Function to describe the scorer for parseScorers, eg. to send it to the shards of a sharded crawl.
+        Output: (str), eg. 'depth:1.0'
+        """
+        return '%s:%r' % (self.name, self.weight)
+
+    def site_score(self, depth, in_links):
+        """
+        Function to score a site.
+        Inputs: depth (int), links followed from a seed to the site (breadth first search depth)
+                in_links (int), links to the site found so far
+        Output: (float)
+        """
+        return 0.0
+
+    def host_score(self, frontier, host):
+        """
+        Function to score the host of a site.
+        Inputs: frontier (PriorityFrontier), eg. for frontier.taken
+                host (str), with the port
+        Output: (float)
+        """
+        return 0.0
+
+class DepthScorer(FrontierScorer):
+    """
+    Breadth first: sites closer to the seeds first.
+    """
+
+    name = 'depth'
+
+    def site_score(self, depth, in_links):
+        return -self.weight * depth
+
+class InLinkScorer(FrontierScorer):
+    """
+    Sites that more pages link to first. Grows with log(1 + in-links), so the first few links count the most.
+    """
+
+    name = 'inlinks'
+
+    def site_score(self, depth, in_links):
+        return self.weight * math.log1p(in_links)
+
+class HostScorer(FrontierScorer):
+    """
+    Fairness between hosts: every site already taken from a host lowers the score of its other sites, so one host's
+    navigation and footer links don't use up the budget. Hosts that have had quota sites taken go last.
+    """
+
+    name = 'hosts'
+
+    def __init__(self, weight = 1.0, quota = None):
+        FrontierScorer.__init__(self, weight)
+        self.quota = quota                                                      # Sites per host before it goes last. None for no quota.
+
+    def to_spec(self):
+        if self.quota is None:
+            return FrontierScorer.to_spec(self)
+        return '%s:%r:%r' % (self.name, self.weight, self.quota)
+
+    def host_score(self, frontier, host):
+        taken = frontier.taken.get(host, 0)
+        if self.quota is not None and taken >= self.quota:
+            return -1e9
+        return -self.weight * taken
+
+class NoveltyScorer(FrontierScorer):
+    """
+    Sites on hosts we haven't taken any site from yet first, to reach new parts of the web.
+    """
+
+    name = 'novelty'
+
+    def host_score(self, frontier, host):
+        return self.weight if host not in frontier.taken else 0.0
+
+SCORERS = {scorer.name:scorer for scorer in (DepthScorer, InLinkScorer, HostScorer, NoveltyScorer)}
+
+def parseScorers(spec):
+    """
+    Function to make the scorers of a PriorityFrontier from their description.
+    Input: spec (str), comma separated NAME[:WEIGHT], eg. 'depth,hosts:2,inlinks,novelty:5'. hosts takes a quota too: 'hosts:1:50'.
+    Output: scorers (list of FrontierScorer). Raises ValueError for an unknown scorer.
+    """
+    scorers = []
+    for item in spec.split(','):
+        name, *values = item.strip().split(':')
+        if name not in SCORERS:
+            raise ValueError('Unknown scorer %r, choose from %s' % (name, ', '.join(SCORERS)))
+        scorers.append(SCORERS[name](*(float(value) for value in values)))
+    return scorers
+
+class PriorityFrontier(Frontier):
+    """
+    The sites yet to visit, best first, as scored by the scorers (see FrontierScorer). Sites with the same score are taken
+    first in first out, so with no scorers this is a Frontier.
+    Each host has a heap of its sites, by site score, and the hosts are in a heap by host score plus the score of their best
+    site. Taking a site only changes the score of its own host, so adding and taking sites are O(log n) however many sites
+    and hosts are queued. Heap entries that are out of date (the site was scored again, or taken) are skipped when they
+    come to the top, and cleared out once there are more of them than sites.
+    """
+
+    def __init__(self, seen = None, scorers = (), max_active = 10000):
+        if seen is None:
+            seen = SeenSet()
+        self.seen = seen                                                        # SeenSet shared with the crawler
+        self.scorers = list(scorers)                                            # FrontierScorers. Their scores are added up.
+        self.entries = {}                                                       # url: [site score, host, depth, in-links, order added], for every queued site
+        self.sites = {}                                                         # host: heap of (-site score, order added, url)
+        self.hosts = []                                                         # Heap of (-(host score + best site score), order added of that site, host)
+        self.host_keys = {}                                                     # host: its latest entry in self.hosts, without the host. The others are out of date.
+        self.taken = {}                                                         # host: number of its sites taken and visited (see started)
+        self.active = OrderedDict()                                             # url: depth, of the max_active sites taken last. Gives the depth of the links found on them.
+        self.max_active = max_active
+        self.added = 0                                                          # Sites added so far, gives the order for ties
+        self.stale = 0                                                          # Out of date entries in the heaps of sites
+
+    def site_score(self, depth, in_links):
+        return sum(scorer.site_score(depth, in_links) for scorer in self.scorers)
+
+    def host_score(self, host):
+        return sum(scorer.host_score(self, host) for scorer in self.scorers)
+
+    def best_site(self, host):
+        """
+        Function to get the best queued site of a host, dropping out of date entries on the way.
+        Input: host (str)
+        Output: (-site score, order added, url), None if the host has no sites queued.
+        """
+        heap = self.sites.get(host)
+        while heap:
+            entry = self.entries.get(heap[0][2])
+            if entry is not None and entry[0] == -heap[0][0]:
+                return heap[0]
+            heapq.heappop(heap)
+            self.stale -= 1
+        self.sites.pop(host, None)
+        return None
+
+    def schedule_host(self, host):
+        best = self.best_site(host)
+        if best is None:
+            self.host_keys.pop(host, None)
+            return
+        key = (best[0] - self.host_score(host), best[1])
+        self.host_keys[host] = key
+        heapq.heappush(self.hosts, key + (host,))
+        if len(self.hosts) > 2 * len(self.host_keys) + 1000:
+            self.hosts = [key + (host,) for host, key in self.host_keys.items()]
+            heapq.heapify(self.hosts)
+
+    def schedule(self, url, entry):
+        heap = self.sites.setdefault(entry[1], [])
+        heapq.heappush(heap, (-entry[0], entry[4], url))
+        if heap[0][2] == url:                                                   # The best site of its host now
+            self.schedule_host(entry[1])
+        if self.stale > len(self.entries) + 1000:
+            self.compact()
+
+    def compact(self):
+        """
+        Function to rebuild the heaps without their out of date entries.
+        """
+        self.sites = {}
+        for url, entry in self.entries.items():
+            self.sites.setdefault(entry[1], []).append((-entry[0], entry[4], url))
+        for heap in self.sites.values():
+            heapq.heapify(heap)
+        self.stale = 0
+        self.hosts = []
+        self.host_keys = {}
+        for host in self.sites:
+            self.schedule_host(host)
+
+    def push(self, url, source = None):
+        """
+        Function to add a site, unless it has been seen already. A link to a site that is still queued counts as an in-link.
+        Inputs: url (str)
+                source (str), the site the link was found on. None for a seed (or a link from another shard).
+        Output: (str), the canonical URL if it was added. None if it had been seen already.
+        """
+        try:
+            canonical = canonicaliseUrl(url)
+        except ValueError:                                                      # Malformed, see SeenSet.add
+            return None
+        entry = self.entries.get(canonical)
+        if entry is not None:
+            if source is not None:
+                entry[3] += 1
+                score = self.site_score(entry[2], entry[3])
+                if score != entry[0]:
+                    entry[0] = score
+                    self.stale += 1                                             # Its old heap entry
+                    self.schedule(canonical, entry)
+            return None
+        url = self.seen.add(url)
+        if url is None:
+            return None
+        depth = self.active.get(source, -1) + 1 if source is not None else 0
+        in_links = 1 if source is not None else 0
+        self.added += 1
+        entry = [self.site_score(depth, in_links), hostOfUrl(url, with_port = True), depth, in_links, self.added]
+        self.entries[url] = entry
+        self.schedule(url, entry)
+        return url
+
+    def pop(self, busy = ()):
+        """
+        Function to take the best site on a host that isn't busy. The sites of busy hosts stay queued with their scores,
+        so they still get in-links, and are compared with the sites found meanwhile once their host is free.
+        Raises IndexError if there is no site at all.
+        Input: busy (set of str), hosts being visited (host[:port], as given by hostOfUrl)
+        Output: (str), the canonical URL. None if all the queued sites are on busy hosts.
+        """
+        if not self.entries:
+            raise IndexError('pop from an empty frontier')
+        skipped = []                                                            # Entries of busy hosts, put back below
+        url = None
+        while self.hosts:
+            item = heapq.heappop(self.hosts)
+            negative_score, order, host = item
+            if self.host_keys.get(host) != (negative_score, order):
+                continue
+            if host in busy:
+                skipped.append(item)
+                continue
+            url = heapq.heappop(self.sites[host])[2]
+            depth = self.entries.pop(url)[2]
+            self.schedule_host(host)                                            # Its next site
+            self.active[url] = depth
+            if len(self.active) > self.max_active:
+                self.active.popitem(last = False)
+            break
+        for item in skipped:
+            heapq.heappush(self.hosts, item)
+        return url
+
+    def started(self, url):
+        """
+        Function called when a site taken with pop is visited: it counts as taken from its host (see HostScorer, NoveltyScorer),
+        and the host is scored again.
+        Input: url (str), as given by pop
+        """
+        host = hostOfUrl(url, with_port = True)
+        self.taken[host] = self.taken.get(host, 0) + 1
+        if host in self.host_keys:
+            self.schedule_host(host)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
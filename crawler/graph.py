@@ -0,0 +1,128 @@
+# Graph export.
+
+import csv
+import os
+import tempfile
+from array import array
+from xml.sax.saxutils import escape as xml_escape
+
+class GraphExporter():
+    """
+    Base class for writing the crawled network to a file while the crawl runs.
+    The crawler calls add_node for every new URL (node), add_edges for the links of every visited site, and close at the end.
+    Nodes are numbered by their ID in the UrlTable of the records.
+    """
+
+    def add_node(self, url_id, url):
+        pass
+
+    def add_edges(self, source_id, target_ids, url_table):
+        pass
+
+    def close(self):
+        pass
+
+class EdgeListExporter(GraphExporter):
+    """
+    Writes the links as an edge list CSV file with a 'source,target' header, one row per link, as URLs.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'w', newline = '', encoding = 'utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(['source', 'target'])
+
+    def add_edges(self, source_id, target_ids, url_table):
+        source = url_table.url(source_id)
+        self.writer.writerows((source, url_table.url(target_id)) for target_id in target_ids)
+
+    def close(self):
+        self.file.close()
+
+class GraphMLExporter(GraphExporter):
+    """
+    Writes the network as a directed GraphML file. Nodes have the id 'n<ID>' and a 'url' attribute.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'w', encoding = 'utf-8')
+        self.file.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                        '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+                        '  <key id="url" for="node" attr.name="url" attr.type="string"/>\n'
+                        '  <graph id="crawl" edgedefault="directed">\n')
+
+    def add_node(self, url_id, url):
+        self.file.write('    <node id="n%d"><data key="url">%s</data></node>\n' % (url_id, xml_escape(url)))
+
+    def add_edges(self, source_id, target_ids, url_table):
+        self.file.writelines('    <edge source="n%d" target="n%d"/>\n' % (source_id, target_id) for target_id in target_ids)
+
+    def close(self):
+        self.file.write('  </graph>\n</graphml>\n')
+        self.file.close()
+
+class CsrExporter(GraphExporter):
+    """
+    Writes the network as a sparse adjacency matrix in CSR form, to a NumPy .npz file in the layout of scipy.sparse.save_npz
+    (so scipy.sparse.load_npz can read it). Row i / column i is the node with ID i. A site that links to another twice gives 2.
+    The URL of each node is written, one per line in ID order, to '<path>.nodes.txt'.
+    While crawling, the links are only appended to a temporary file. The matrix is put together on disk when the crawl is closed.
+    Needs numpy (only imported in close).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.nodes_file = open(path + '.nodes.txt', 'w', encoding = 'utf-8')
+        self.links_file = tempfile.TemporaryFile()                              # Target IDs of all links, one site after another
+        self.num_links = 0
+        self.rows = array('q')                                                  # Source ID of each site with links
+        self.row_start = array('q')                                             # Where its links start in links_file
+        self.row_count = array('q')                                             # How many links it has
+        self.num_nodes = 0
+
+    def add_node(self, url_id, url):
+        self.nodes_file.write(url + '\n')
+        self.num_nodes = max(self.num_nodes, url_id + 1)
+
+    def add_edges(self, source_id, target_ids, url_table):
+        if not len(target_ids):
+            return
+        self.rows.append(source_id)
+        self.row_start.append(self.num_links)
+        self.row_count.append(len(target_ids))
+        array('q', target_ids).tofile(self.links_file)
+        self.num_links += len(target_ids)
+
+    def close(self):
+        import numpy                                                            # Only needed here, so the crawl doesn't depend on it
+
+        self.nodes_file.close()
+        self.links_file.flush()
+
+        # 1. Row pointers: how many links each node has, added up.
+        counts = numpy.zeros(self.num_nodes, dtype = numpy.int64)
+        counts[numpy.frombuffer(self.rows, dtype = numpy.int64)] = numpy.frombuffer(self.row_count, dtype = numpy.int64)
+        indptr = numpy.zeros(self.num_nodes + 1, dtype = numpy.int64)
+        numpy.cumsum(counts, out = indptr[1:])
+
+        # 2. Column indices: copy each site's links from the temporary file into the position of its row, on disk.
+        with tempfile.TemporaryDirectory() as scratch:
+            indices = numpy.lib.format.open_memmap(os.path.join(scratch, 'indices.npy'), mode = 'w+', dtype = numpy.int64, shape = (self.num_links,))
+            if self.num_links:
+                links = numpy.memmap(self.links_file, dtype = numpy.int64, mode = 'r', shape = (self.num_links,))
+                for source_id, start, count in zip(self.rows, self.row_start, self.row_count):
+                    indices[indptr[source_id]:indptr[source_id] + count] = links[start:start + count]
+                del links
+            indices.flush()
+
+            # 3. Save. Every link has the value 1, broadcast so it takes no memory.
+            numpy.savez_compressed(self.path,
+                                   indices = indices,
+                                   indptr = indptr,
+                                   format = numpy.array(b'csr'),
+                                   shape = numpy.array((self.num_nodes, self.num_nodes)),
+                                   data = numpy.broadcast_to(numpy.int8(1), (self.num_links,)))
+            del indices
+        self.links_file.close()
@@ -0,0 +1,153 @@
+# Link extraction from streamed HTML bodies.
+
+import codecs
+from html.parser import HTMLParser
+
+class LinkExtractor(HTMLParser):
+    """
+    Streaming link extractor. The page is fed in as it arrives and the href of every <a> tag is collected,
+    without building a tree of the page. Once max_links links have been found, the rest of the page is ignored.
+    With with_text, the links are (href, anchor text) tuples instead of just the href.
+    """
+
+    def __init__(self, max_links = None, with_text = False):
+        HTMLParser.__init__(self, convert_charrefs = True)
+        self.max_links = max_links                                              # Stop after this many links. None for no limit.
+        self.with_text = with_text                                              # Also collect the anchor text of each link
+        self.links = []                                                         # Links found and not yet taken
+        self.num_links = 0                                                      # Links found so far
+        self.base_href = None                                                   # href of the <base> tag, if the page has one
+        self.done = False                                                       # True once max_links links have been found
+        self.open_href = None                                                   # href of the <a> tag we are inside (with_text only)
+        self.open_text = []                                                     # Text seen so far inside that <a> tag
+
+    def feed(self, data):
+        if not self.done:
+            HTMLParser.feed(self, data)
+
+    def close(self):
+        if not self.done:
+            HTMLParser.close(self)
+        self.finish_link()
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            self.finish_link()                                                  # An <a> that was never closed
+            for name, value in attrs:
+                if name == 'href' and value:
+                    if self.with_text:
+                        self.open_href = value
+                    else:
+                        self.add_link(value)
+                    break
+        elif tag == 'base' and self.base_href is None:
+            for name, value in attrs:
+                if name == 'href' and value:
+                    self.base_href = value
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag == 'a':
+            self.finish_link()
+
+    def handle_endtag(self, tag):
+        if tag == 'a':
+            self.finish_link()
+
+    def handle_data(self, data):
+        if self.open_href is not None:
+            self.open_text.append(data)
+
+    def finish_link(self):
+        if self.open_href is not None:
+            self.add_link((self.open_href, ' '.join(''.join(self.open_text).split())))
+            self.open_href = None
+            self.open_text = []
+
+    def add_link(self, link):
+        if self.done:
+            return
+        self.links.append(link)
+        self.num_links += 1
+        if self.max_links is not None and self.num_links >= self.max_links:
+            self.done = True
+
+    def take_links(self):
+        """
+        Function to take the links found since the last call.
+        Output: (list)
+        """
+        links = self.links
+        self.links = []
+        return links
+
+def iterLinks(chunks, max_links = None, with_text = False, extractor = None):
+    """
+    Generator that gives the links of a page as its chunks arrive. Stops reading chunks once max_links links have been found.
+    Inputs: chunks (iterable of str), the page, eg. from responseChunks
+            max_links (int), stop after this many links. None for no limit.
+            with_text (Bool), give (href, anchor text) tuples instead of hrefs.
+            extractor (LinkExtractor), to use instead of a new one, eg. to read base_href afterwards.
+    Output: href (str), or (href, anchor text) tuples
+    """
+    if extractor is None:
+        extractor = LinkExtractor(max_links, with_text)
+    for chunk in chunks:
+        extractor.feed(chunk)
+        yield from extractor.take_links()
+        if extractor.done:
+            return
+    extractor.close()
+    yield from extractor.take_links()
+
+def responseChunks(req_obj, chunk_size = 16384, max_bytes = None):
+    """
+    Generator that reads the body of a (streamed) response as text, chunk by chunk. Each chunk of bytes is decoded as it
+    arrives, so the body is never held in memory as a whole.
+    If the body is longer than max_bytes, reading stops there and req_obj.truncated is set to True.
+    Inputs: req_obj, requests.response object, requested with stream = True
+            chunk_size (int), bytes per chunk
+            max_bytes (int), most bytes to read (after decompression). None for no limit.
+    Output: str chunks
+    """
+    encoding = req_obj.encoding or 'utf-8'                                      # No charset given and not text/*: HTML is most likely utf-8
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)(errors = 'replace')
+    except LookupError:                                                         # A charset Python doesn't know
+        decoder = codecs.getincrementaldecoder('utf-8')(errors = 'replace')
+    req_obj.truncated = False
+    bytes_read = 0
+    for chunk in req_obj.iter_content(chunk_size = chunk_size):
+        if max_bytes is not None and bytes_read + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - bytes_read]
+            req_obj.truncated = True
+        bytes_read += len(chunk)
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+        if req_obj.truncated:
+            return                                                              # Without the bytes of a character cut in half
+    text = decoder.decode(b'', final = True)
+    if text:
+        yield text
+
+HTML_TYPES = ('text/html', 'application/xhtml+xml')
+
+def bodyProblem(req_obj, max_bytes = None, types = HTML_TYPES):
+    """
+    Function to check from the headers of a response, before reading its body, whether it is worth reading.
+    Inputs: req_obj, requests.response object
+            max_bytes (int), a body whose Content-Length is larger than this isn't read. None for no limit.
+            types (tuple of str), the media types to read. A type ending in '/' stands for all of them, eg. 'text/'.
+                                  A response without a Content-Type is read.
+    Output: (str), 'type' or 'size' if the body shouldn't be read. None if it should.
+    """
+    content_type = req_obj.headers.get('Content-Type')
+    if content_type:
+        media_type = content_type.split(';', 1)[0].strip().lower()
+        if not any(media_type.startswith(allowed) if allowed.endswith('/') else media_type == allowed for allowed in types):
+            return 'type'
+    content_length = req_obj.headers.get('Content-Length')
+    if max_bytes is not None and content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        return 'size'
+    return None
@@ -0,0 +1,272 @@
+# Metrics: counters, per-stage timings and their Prometheus export.
+
+import bisect
+import cProfile
+import os
+import pstats
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)   # Seconds
+
+class Metrics():
+    """
+    Counters and histograms for the crawl, kept in memory and safe to use from several threads.
+    render() gives them in the Prometheus text format (see MetricsWriter and MetricsServer).
+
+    Stages timed in crawler_stage_seconds:
+        connect     - DNS lookup (a DnsCache lookup, see dns), TCP and TLS handshakes of a new connection
+        dns         - waiting for a host name to be resolved, when it wasn't cached or prefetched
+        politeness  - waiting for the crawl-delay of a host
+        robots      - robots_check (a cache lookup, or downloading and compiling the file)
+        tos         - ToS_check (a cache lookup, or the homepage and terms page are downloaded and read)
+        download    - a page: until its headers arrive, plus reading its body
+        parse       - extracting the links of a page (not counting reading the body)
+        resolve     - turning the links of a page into canonical absolute URLs
+        enqueue     - adding the links of a page to the frontier
+    With profile_every > 0, one in every profile_every calls of profiled() is run under cProfile (see profiled).
+    """
+
+    def __init__(self, profile_every = 0):
+        self.lock = threading.Lock()
+        self.counters = OrderedDict()                                           # name: [help, label name, {label value: count}]
+        self.histograms = OrderedDict()                                         # name: [help, label name, buckets, {label value: [count per bucket..., sum, count]}]
+        self.profile_every = profile_every                                      # Profile one in this many calls of profiled(). 0 for none.
+        self.profile_calls = 0
+        self.profile_stats = None                                               # pstats.Stats of the profiled calls
+        self.declare_histogram('crawler_stage_seconds', 'Time spent in each stage of the crawl.', 'stage', STAGE_BUCKETS)
+        self.declare_counter('crawler_responses_total', 'HTTP responses, by status class.', 'status')
+        self.declare_counter('crawler_request_errors_total', 'Requests that failed without a response, by exception.', 'error')
+        self.declare_counter('crawler_sites_total', 'Sites recorded, by outcome.', 'outcome')
+        self.declare_counter('crawler_links_total', 'Links found on visited sites.')
+        self.declare_counter('crawler_enqueued_total', 'Links added to the frontier (new sites).')
+        self.declare_counter('crawler_links_filtered_total', 'Links dropped before the frontier, by reason (scheme, nogo, invalid or robots).', 'reason')
+        self.declare_counter('crawler_bodies_skipped_total', 'Bodies not read (not HTML, or too large) or cut off at the size limit, by reason.', 'reason')
+        self.declare_counter('crawler_dns_lookups_total', 'Host names looked up in the DNS cache, by result.', 'result')
+        self.declare_counter('crawler_cache_hits_total', 'Conditional requests answered with 304 Not Modified, served from the response cache.')
+
+    def declare_counter(self, name, help_text, label = None):
+        with self.lock:
+            self.counters.setdefault(name, [help_text, label, {}])
+
+    def declare_histogram(self, name, help_text, label = None, buckets = STAGE_BUCKETS):
+        with self.lock:
+            self.histograms.setdefault(name, [help_text, label, tuple(buckets), {}])
+
+    def inc(self, name, value = 1, label = None):
+        """
+        Function to add to a counter.
+        Inputs: name (str), a declared counter
+                value (int)
+                label (str), the value of the counter's label, eg. '2xx'
+        """
+        with self.lock:
+            values = self.counters[name][2]
+            values[label] = values.get(label, 0) + value
+
+    def observe(self, name, value, label = None):
+        """
+        Function to add a value to a histogram.
+        Inputs: name (str), a declared histogram
+                value (float)
+                label (str), the value of the histogram's label, eg. 'parse'
+        """
+        with self.lock:
+            _, _, buckets, values = self.histograms[name]
+            counts = values.get(label)
+            if counts is None:
+                counts = values[label] = [0] * (len(buckets) + 3)                # A count per bucket and +Inf, then sum and count
+            counts[bisect.bisect_left(buckets, value)] += 1                     # Not cumulative here, render() adds them up
+            counts[-2] += value
+            counts[-1] += 1
+
+    def observe_stage(self, stage, seconds):
+        self.observe('crawler_stage_seconds', seconds, stage)
+
+    @contextmanager
+    def stage(self, stage):
+        """
+        Context manager that times its block as a stage of the crawl, eg. with metrics.stage('resolve'): ...
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('crawler_stage_seconds', time.perf_counter() - start, stage)
+
+    def profiled(self, function, *args):
+        """
+        Function to call function(*args), under cProfile for one in every profile_every calls.
+        The statistics of the profiled calls are added up in profile_stats (see dump_profile).
+        cProfile only sees the thread it is started in, so this goes around the work of one thread (eg. Crawler.visit).
+        """
+        if self.profile_every <= 0:
+            return function(*args)
+        with self.lock:
+            self.profile_calls += 1
+            sample = (self.profile_calls - 1) % self.profile_every == 0           # The first call, then one in every profile_every
+        if not sample:
+            return function(*args)
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(function, *args)
+        finally:
+            with self.lock:
+                if self.profile_stats is None:
+                    self.profile_stats = pstats.Stats(profile)
+                else:
+                    self.profile_stats.add(profile)
+
+    def dump_profile(self, path):
+        """
+        Function to write the profile statistics (for pstats or snakeviz). Nothing is written if no call was profiled.
+        Input: path (str)
+        """
+        with self.lock:
+            if self.profile_stats is not None:
+                self.profile_stats.dump_stats(path)
+
+    def snapshot(self):
+        """
+        Function to copy the counters and histograms, eg. to send them to another process.
+        Output: (dict), {'counters':{name: {label: count}}, 'histograms':{name: {label: [...]}}}
+        """
+        with self.lock:
+            return {'counters':{name: dict(counter[2]) for name, counter in self.counters.items()},
+                    'histograms':{name: {label: list(counts) for label, counts in histogram[3].items()} for name, histogram in self.histograms.items()}}
+
+    def merge(self, snapshot):
+        """
+        Function to add the counters and histograms of a snapshot (eg. from a shard) to these.
+        Input: snapshot (dict), from snapshot()
+        """
+        with self.lock:
+            for name, values in snapshot['counters'].items():
+                counts = self.counters[name][2]
+                for label, value in values.items():
+                    counts[label] = counts.get(label, 0) + value
+            for name, values in snapshot['histograms'].items():
+                histogram = self.histograms[name][3]
+                for label, counts in values.items():
+                    if label in histogram:
+                        histogram[label] = [a + b for a, b in zip(histogram[label], counts)]
+                    else:
+                        histogram[label] = list(counts)
+
+    def render(self):
+        """
+        Function to give all metrics in the Prometheus text exposition format.
+        Output: (str)
+        """
+        def labels(label_name, label, extra = ''):
+            pairs = []
+            if label_name is not None and label is not None:
+                pairs.append('%s="%s"' % (label_name, str(label).replace('\\', '\\\\').replace('"', '\\"')))
+            if extra:
+                pairs.append(extra)
+            return '{%s}' % ','.join(pairs) if pairs else ''
+
+        lines = []
+        with self.lock:
+            for name, (help_text, label_name, values) in self.counters.items():
+                lines.append('# HELP %s %s' % (name, help_text))
+                lines.append('# TYPE %s counter' % name)
+                for label, value in values.items():
+                    lines.append('%s%s %s' % (name, labels(label_name, label), value))
+            for name, (help_text, label_name, buckets, values) in self.histograms.items():
+                lines.append('# HELP %s %s' % (name, help_text))
+                lines.append('# TYPE %s histogram' % name)
+                for label, counts in values.items():
+                    cumulative = 0
+                    for bound, count in zip(buckets + ('+Inf',), counts):
+                        cumulative += count
+                        lines.append('%s_bucket%s %d' % (name, labels(label_name, label, 'le="%s"' % bound), cumulative))
+                    lines.append('%s_sum%s %r' % (name, labels(label_name, label), counts[-2]))
+                    lines.append('%s_count%s %d' % (name, labels(label_name, label), counts[-1]))
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """
+        Function to write render() to a file, eg. for the textfile collector of node_exporter.
+        The file is replaced in one step, so a reader never sees half of it.
+        Input: path (str)
+        """
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as metrics_file:
+            metrics_file.write(self.render())
+        os.replace(temp_path, path)
+
+class TimedIterator():
+    """
+    Iterator that passes on the items of another one, and adds up the time spent waiting for them in .elapsed.
+    Used to tell the time reading a streamed body apart from the time parsing it.
+    """
+
+    def __init__(self, iterable, keep = False):
+        self.iterator = iter(iterable)
+        self.elapsed = 0.0
+        self.kept = [] if keep else None                                        # The items passed on, with keep = True (eg. to cache a body)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            item = next(self.iterator)
+        finally:
+            self.elapsed += time.perf_counter() - start
+        if self.kept is not None:
+            self.kept.append(item)
+        return item
+
+class MetricsWriter():
+    """
+    Writes the metrics to a file every `interval` seconds from a background thread, and once more on close.
+    """
+
+    def __init__(self, metrics, path, interval = 10.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target = self.write_loop, name = 'MetricsWriter', daemon = True)
+        self.thread.start()
+
+    def write_loop(self):
+        while not self.stopped.wait(self.interval):
+            self.metrics.write(self.path)
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+        self.metrics.write(self.path)
+
+class MetricsServer():
+    """
+    Serves the metrics over HTTP (at any path, eg. /metrics) from a background thread, for Prometheus to scrape.
+    """
+
+    def __init__(self, metrics, address = ('127.0.0.1', 9100)):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                body = metrics.render().encode('utf-8')
+                handler.send_response(200)
+                handler.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(address, Handler)
+        self.address = self.server.server_address
+        threading.Thread(target = self.server.serve_forever, name = 'MetricsServer', daemon = True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
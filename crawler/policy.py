@@ -0,0 +1,271 @@
+# Crawl policies. Decide whether a host may be crawled, instead of asking at the keyboard for every URL.
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .robots import list_splitter
+
+class CrawlPolicy():
+    """
+    Base class for crawl policies.
+    A policy decides whether a host may be crawled, given the comments from its robots file and
+    the relevant paragraphs of its terms of service. Decisions are cached, so each host is decided once.
+    Subclasses implement decide_robots and decide_tos. This base class allows everything.
+    """
+
+    def __init__(self):
+        self.robots_decisions = {}                                              # host: Bool, True if the robots comments allow the crawl
+        self.tos_decisions = {}                                                 # host: (version of the terms, Bool), True if the terms of service allow the crawl
+        self.lock = threading.Lock()                                            # One decision at a time, so prompts from different threads don't mix
+
+    def robots_ok(self, host, comments):
+        """
+        Function to decide, once per host, whether to crawl it after reading the robots file comments.
+        Inputs: host (str), eg. 'www.abcd.com'
+                comments (str), all comments from the robots file
+        Output: (Bool), True if we may continue.
+        """
+        with self.lock:
+            if host not in self.robots_decisions:
+                self.robots_decisions[host] = bool(self.decide_robots(host, comments))
+            return self.robots_decisions[host]
+
+    def tos_ok(self, host, tos_paragraphs, version = None):
+        """
+        Function to decide, once per host (and version of its terms), whether the terms of service allow the crawl.
+        Inputs: host (str), eg. 'www.abcd.com'
+                tos_paragraphs (list of str), the paragraphs of the terms that mention robots/crawlers/spiders
+                version (str), hash of the terms page. If the terms change, the policy decides again.
+        Output: (Bool), True if we may continue.
+        """
+        with self.lock:
+            decision = self.tos_decisions.get(host)
+            if decision is None or decision[0] != version:
+                decision = (version, bool(self.decide_tos(host, tos_paragraphs)))
+                self.tos_decisions[host] = decision
+            return decision[1]
+
+    def decide_robots(self, host, comments):
+        return True
+
+    def decide_tos(self, host, tos_paragraphs):
+        return True
+
+def keywordPattern(keywords):
+    """
+    Function to compile keywords into one case-insensitive regex that matches any of them.
+    Input: keywords (list of str), matched as plain text
+    Output: (re.Pattern), or None if there are no keywords.
+    """
+    if not keywords:
+        return None
+    return re.compile('|'.join(map(re.escape, keywords)), re.IGNORECASE)
+
+class RulePolicy(CrawlPolicy):
+    """
+    Non-interactive policy, configured with allow/deny rules per host and keyword rules for the robots comments and ToS text.
+    A host rule applies to the host and all of its subdomains, the most specific rule wins.
+    An 'allow' host rule skips the keyword rules. Anything not matched gets the default.
+
+    Example configuration (as a dict, or as a JSON file for RulePolicy.from_file):
+    {"default": "allow",
+     "hosts": {"example.com": "deny", "docs.example.com": "allow"},
+     "robots_keywords": {"deny": ["do not crawl"]},
+     "tos_keywords": {"deny": ["automated access is prohibited", "no robots"]}}
+    """
+
+    def __init__(self, default = 'allow', hosts = None, robots_deny_keywords = (), tos_deny_keywords = ()):
+        CrawlPolicy.__init__(self)
+        if default not in ('allow', 'deny'):
+            raise ValueError("Policy default must be 'allow' or 'deny', not %r" % (default,))
+        self.default = default                                                  # 'allow' or 'deny'
+        self.hosts = {}                                                         # host: 'allow'/'deny'
+        for host, rule in (hosts or {}).items():
+            if rule not in ('allow', 'deny'):
+                raise ValueError("Policy rule for %s must be 'allow' or 'deny', not %r" % (host, rule))
+            self.hosts[host.lower().lstrip('.')] = rule
+        self.robots_deny_keywords = [k.lower() for k in robots_deny_keywords]   # Deny if the robots comments contain any of these
+        self.tos_deny_keywords = [k.lower() for k in tos_deny_keywords]         # Deny if the relevant ToS paragraphs contain any of these
+        self.robots_deny_re = keywordPattern(self.robots_deny_keywords)         # The keywords in one regex, so the text is scanned once. None for no keywords.
+        self.tos_deny_re = keywordPattern(self.tos_deny_keywords)
+
+    @classmethod
+    def from_dict(cls, config):
+        """
+        Function to build a policy from a configuration dictionary (see the class docstring).
+        Input: config (dict)
+        Output: RulePolicy
+        """
+        return cls(default = config.get('default', 'allow'),
+                   hosts = config.get('hosts'),
+                   robots_deny_keywords = config.get('robots_keywords', {}).get('deny', ()),
+                   tos_deny_keywords = config.get('tos_keywords', {}).get('deny', ()))
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Function to build a policy from a JSON configuration file.
+        Input: path (str)
+        Output: RulePolicy
+        """
+        with open(path) as policy_file:
+            return cls.from_dict(json.load(policy_file))
+
+    def to_dict(self):
+        """
+        Function to give the configuration of the policy, in the format of from_dict. Used to send it to other processes.
+        Output: config (dict)
+        """
+        return {'default':self.default,
+                'hosts':dict(self.hosts),
+                'robots_keywords':{'deny':list(self.robots_deny_keywords)},
+                'tos_keywords':{'deny':list(self.tos_deny_keywords)}}
+
+    def host_rule(self, host):
+        """
+        Function to find the most specific host rule for a host.
+        'a.b.example.com' is checked against 'a.b.example.com', then 'b.example.com', then 'example.com', then 'com'.
+        Input: host (str)
+        Output: 'allow', 'deny' or None if no rule applies.
+        """
+        labels = host.split('.')
+        for i in range(len(labels)):
+            rule = self.hosts.get('.'.join(labels[i:]))
+            if rule is not None:
+                return rule
+        return None
+
+    def decide_robots(self, host, comments):
+        rule = self.host_rule(host)
+        if rule is not None:
+            return rule == 'allow'
+        if self.robots_deny_re is not None and self.robots_deny_re.search(comments):
+            return False
+        return self.default == 'allow'
+
+    def decide_tos(self, host, tos_paragraphs):
+        rule = self.host_rule(host)
+        if rule is not None:
+            return rule == 'allow'
+        if self.tos_deny_re is not None:
+            for paragraph in tos_paragraphs:
+                if self.tos_deny_re.search(paragraph):
+                    return False
+        return self.default == 'allow'
+
+class InteractivePolicy(CrawlPolicy):
+    """
+    Policy that shows the robots comments and ToS paragraphs and asks the user, once per host.
+    """
+
+    def decide_robots(self, host, comments):
+        print('These are the comments from the .robots.txt file:', comments)
+        shallWeContinue = input('Based on the comments from the robots file, do you wish to continue?(Y/N): ')
+        return 'N' not in shallWeContinue
+
+    def decide_tos(self, host, tos_paragraphs):
+        for paragraph in tos_paragraphs:
+            # Show the user the 'terms'. If they read it and wish to continue, they may do so. Otherwise not.
+            print(paragraph)
+        okContinue = input("Based on the above, will you continue with the crawl? Do the T&C's allow it? (Y/N) ")
+        return okContinue.strip() == 'Y'
+
+TOS_KEYWORDS = re.compile('robot|crawler|spider', re.IGNORECASE)              # What makes a paragraph of the terms relevant to us
+
+def relevantTerms(terms_text):
+    """
+    Function to get the paragraphs of a terms of service page that mention robots, crawlers or spiders.
+    Input: terms_text (str), the terms page. Paragraphs are separated by empty lines.
+    Output: (list of str), each paragraph with its lines joined by spaces.
+    """
+    if TOS_KEYWORDS.search(terms_text) is None:                                 # Most terms pages: one scan of the text and we are done
+        return []
+    return [paragraph for paragraph in (' '.join(lines) for lines in list_splitter(terms_text.split('\n'), ''))
+            if TOS_KEYWORDS.search(paragraph)]
+
+class TermsCache():
+    """
+    Remembers the outcome of ToS_check for each host, keyed by scheme + host (eg. 'https://www.abcd.com'), so the homepage
+    and terms page are read once per host instead of for every site on it. With a path, the outcomes are also kept in an
+    SQLite file for the next crawl.
+    An outcome expires after ttl seconds (error_ttl if the homepage or terms page couldn't be read). After that the terms
+    page is downloaded again, and if its hash (the version) is unchanged the outcome is renewed without reading it again.
+    The relevant paragraphs of the terms are kept with the outcome, so the policy of the current crawl can decide on
+    them again (see Crawler.ToS_check): a cached outcome only saves downloading and reading the pages.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS terms (root_url TEXT PRIMARY KEY, outcome TEXT, status INTEGER, terms_url TEXT, version TEXT, expires REAL, paragraphs TEXT);
+    """
+
+    def __init__(self, path = None, ttl = 86400, error_ttl = 300, max_hosts = 100000):
+        self.path = path                                                        # SQLite file, None to keep the outcomes in memory only
+        self.ttl = ttl                                                          # Seconds an outcome is good for
+        self.error_ttl = error_ttl                                              # Seconds to remember a homepage or terms page that couldn't be read
+        self.max_hosts = max_hosts                                              # Hosts kept in memory
+        self.entries = OrderedDict()                                            # root_url: [outcome ('Y'/'N'), status, terms_url, version, expiry (time.time), paragraphs]. Least recently used first.
+        self.lock = threading.Lock()
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path, timeout = 30, check_same_thread = False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.executescript(self.SCHEMA)
+            columns = [row[1] for row in self.connection.execute('PRAGMA table_info(terms)')]
+            if 'paragraphs' not in columns:                                     # A file from before the paragraphs were kept
+                with self.connection:
+                    self.connection.execute('ALTER TABLE terms ADD COLUMN paragraphs TEXT')
+
+    def get(self, root_url):
+        """
+        Function to look up the outcome for a host.
+        Input: root_url (str)
+        Output: entry (list), [outcome, status, terms_url, version, expiry, paragraphs], also once it has expired.
+                None if there is none. paragraphs is None if there was no terms page (or the entry is from an older file).
+        """
+        with self.lock:
+            entry = self.entries.get(root_url)
+            if entry is None and self.connection is not None:
+                row = self.connection.execute('SELECT outcome, status, terms_url, version, expires, paragraphs FROM terms WHERE root_url = ?', (root_url,)).fetchone()
+                if row is not None:
+                    entry = list(row)
+                    if entry[5] is not None:
+                        entry[5] = json.loads(entry[5])
+                    entry = self.remember(root_url, entry)
+            elif entry is not None:
+                self.entries.move_to_end(root_url)
+            return entry
+
+    def put(self, root_url, outcome, status, terms_url = None, version = None, paragraphs = None):
+        """
+        Function to store the outcome for a host.
+        Inputs: root_url (str)
+                outcome (str), 'Y' or 'N', as given by ToS_check
+                status (int), as given by ToS_check
+                terms_url (str), the terms page. None if there is none.
+                version (str), hash of the terms page
+                paragraphs (list of str), the relevant paragraphs of the terms page (see relevantTerms)
+        """
+        ttl = self.ttl if status // 100 == 2 else self.error_ttl
+        entry = [outcome, status, terms_url, version, time.time() + ttl, paragraphs]
+        with self.lock:
+            self.remember(root_url, entry)
+            if self.connection is not None:
+                with self.connection:
+                    self.connection.execute('INSERT OR REPLACE INTO terms (root_url, outcome, status, terms_url, version, expires, paragraphs) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                            [root_url] + entry[:5] + [None if paragraphs is None else json.dumps(paragraphs)])
+
+    def remember(self, root_url, entry):
+        self.entries[root_url] = entry
+        self.entries.move_to_end(root_url)
+        while len(self.entries) > self.max_hosts:                               # Drop the least recently used hosts (they stay in the file)
+            self.entries.popitem(last = False)
+        return entry
+
+    def close(self):
+        if self.connection is not None:
+            with self.lock:
+                self.connection.close()
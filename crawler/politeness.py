@@ -0,0 +1,155 @@
+# Politeness: per-host crawl-delays and adaptive rates.
+
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+class HostScheduler():
+    """
+    Keeps track of when each host was last requested, so that requests to the same host are at least a crawl-delay apart.
+    Requests to different hosts don't wait for each other. Safe to use from several threads.
+    """
+
+    def __init__(self):
+        self.last_request = {}                                                  # host: time.monotonic() of the latest request (booked) to the host
+        self.not_before = {}                                                    # host: time.monotonic() before which the host mustn't be requested (Retry-After)
+        self.lock = threading.Lock()
+
+    def wait(self, host, delay):
+        """
+        Function to wait (if needed) until the crawl-delay has passed since the last request to a host, and book this request.
+        The delay is the one known now, so a Crawl-delay read from the robots file applies straight after it is fetched.
+        Inputs: host (str), eg. 'www.abcd.com'
+                delay (float), crawl-delay of the host, in seconds
+        Output: (float), the number of seconds we waited.
+        """
+        with self.lock:
+            now = time.monotonic()
+            last = self.last_request.get(host)
+            if last is None:
+                start = now
+            else:
+                start = max(now, last + delay)
+            start = max(start, self.not_before.get(host, start))
+            self.last_request[host] = start                                     # Booked while holding the lock, so two threads can't get the same slot
+        if start > now:
+            time.sleep(start - now)
+        return start - now
+
+    def hold(self, host, seconds):
+        """
+        Function to keep the next request to a host from starting for some seconds, eg. for a Retry-After header.
+        Inputs: host (str)
+                seconds (float)
+        """
+        with self.lock:
+            until = time.monotonic() + seconds
+            if until > self.not_before.get(host, 0):
+                self.not_before[host] = until
+
+def retryAfterSeconds(value, now = None):
+    """
+    Function to read a Retry-After header.
+    Inputs: value (str), eg. '120' or 'Wed, 21 Oct 2015 07:28:00 GMT'. May be None.
+            now (datetime), for a date. Defaults to the current time.
+    Output: (float), seconds from now. None if there is no (readable) header.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        return max(seconds, 0.0) if math.isfinite(seconds) else None
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:                                                 # '-0000' gives a naive datetime. HTTP dates are in GMT.
+        retry_at = retry_at.replace(tzinfo = timezone.utc)
+    if now is None:
+        now = datetime.now(timezone.utc)
+    elif now.tzinfo is None:
+        now = now.replace(tzinfo = timezone.utc)
+    return max((retry_at - now).total_seconds(), 0.0)
+
+class RateController():
+    """
+    Adaptive crawl-delay for each host.
+    A host starts at the Crawl-delay from its robots file, or at our standard delay if the file doesn't give one.
+    The delay doubles (backoff) after a 429 or 5xx response, a timeout or a connection error, up to max_delay.
+    After each quick response (faster than fast_response seconds) it shrinks by speedup, but never below the floor:
+    the robots Crawl-delay if there is one, min_delay otherwise. So we are never less polite than the host asks.
+    A Retry-After header on a 429/503 response is honoured as well (see on_response).
+    Safe to use from several threads.
+    """
+
+    def __init__(self, min_delay = 1.0, max_delay = 600.0, backoff = 2.0, speedup = 0.8, fast_response = 1.0, max_retry_after = 3600.0):
+        self.min_delay = min_delay                                              # Fastest we go for a host without a robots Crawl-delay, in seconds
+        self.max_delay = max_delay                                              # Slowest the backoff goes, in seconds
+        self.backoff = backoff                                                  # The delay is multiplied by this after an error
+        self.speedup = speedup                                                  # and by this after a quick response
+        self.fast_response = fast_response                                      # Responses quicker than this (s) count as quick
+        self.max_retry_after = max_retry_after                                  # Longest Retry-After we wait for, in seconds
+        self.hosts = {}                                                         # host: [delay, floor, robots Crawl-delay]
+        self.lock = threading.Lock()
+
+    def delay(self, host, robots_delay, default_delay):
+        """
+        Function to get the current crawl-delay of a host.
+        Inputs: host (str), eg. 'www.abcd.com'
+                robots_delay (float), the Crawl-delay from its robots file. None if it gives none, or isn't downloaded yet.
+                default_delay (float), the delay to start at without a robots Crawl-delay
+        Output: (float), seconds
+        """
+        with self.lock:
+            entry = self.hosts.get(host)
+            if entry is None:
+                if robots_delay is not None:
+                    entry = [robots_delay, robots_delay, robots_delay]
+                else:
+                    entry = [default_delay, min(self.min_delay, default_delay), None]
+                self.hosts[host] = entry
+            elif robots_delay is not None and robots_delay != entry[2]:         # We have just read (or re-read) its robots file
+                if entry[2] is None:                                            # Start from its Crawl-delay, instead of our standard delay
+                    entry[0] = robots_delay
+                entry[0] = max(entry[0], robots_delay)                          # Keep any backoff
+                entry[1] = entry[2] = robots_delay
+            return entry[0]
+
+    def on_response(self, host, status, elapsed, retry_after = None):
+        """
+        Function to adjust the delay of a host after a response.
+        Inputs: host (str)
+                status (int), the status code
+                elapsed (float), seconds until the response arrived
+                retry_after (str), the Retry-After header, if any
+        Output: (float), seconds the host must not be requested for (from Retry-After). 0 if none.
+        """
+        with self.lock:
+            entry = self.hosts.get(host)
+            if entry is None:
+                return 0.0
+            if status == 429 or status // 100 == 5:
+                entry[0] = min(max(entry[0], entry[1], self.min_delay) * self.backoff, self.max_delay)
+                if status in (429, 503):
+                    hold = retryAfterSeconds(retry_after)
+                    if hold is not None:
+                        return min(hold, self.max_retry_after)
+            elif elapsed < self.fast_response:
+                entry[0] = max(entry[0] * self.speedup, entry[1])
+        return 0.0
+
+    def on_error(self, host):
+        """
+        Function to back off from a host after a timeout or a connection error.
+        Input: host (str)
+        """
+        with self.lock:
+            entry = self.hosts.get(host)
+            if entry is not None:
+                entry[0] = min(max(entry[0], entry[1], self.min_delay) * self.backoff, self.max_delay)
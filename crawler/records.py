@@ -0,0 +1,237 @@
+# Compact crawl records, and the entries of sites_dict built from them.
+
+import logging
+import math
+from array import array
+from collections.abc import Mapping
+
+logger = logging.getLogger(__name__)                                            # Diagnostics. main() shows them on the console.
+
+def getSiteStatus(req_obj, url):
+    """
+    Function to make sense of the status code from accessing a website.
+    Input: requests.response object: contains status code
+           url: (str), the URL that was requested
+    Output: str_status_code: string containing status code.
+    """
+    str_status_code = str(req_obj.status_code)
+    if len(str_status_code) != 3:
+        logger.warning('Status code problem (%s), url: %s', str_status_code, url)
+        return str_status_code
+
+    if str_status_code[0] == '2':
+        #"Robots acquisition successful. Conditional crawling is likely.")
+        return str_status_code
+
+    elif str_status_code[0] == '3':
+        logger.info('Redirect (%s), url: %s', str_status_code, url)
+        return str_status_code
+
+    elif str_status_code[0] == '4':
+        logger.info('Client error (%s), url: %s', str_status_code, url)
+        return str_status_code
+
+    elif str_status_code[0] == '5':
+        logger.warning('Server error (%s). Assume a temporary error, no crawling shall proceed - url: %s', str_status_code, url)
+        return str_status_code
+
+    else:
+        logger.warning('Some other error (%s), url: %s', str_status_code, url)
+        return str_status_code
+
+def siteOutcome(site_record):
+    """
+    Function to sum up the outcome of an attempt, eg. for the metrics.
+    Input: site_record (dict), an entry of sites_dict
+    Output: (str), 'visited', 'nogo', 'robots', 'tos' or 'failed'
+    """
+    if site_record['links'] is not None:
+        return 'visited'
+    if site_record['nogo']:
+        return 'nogo'
+    if site_record['robots']:
+        return 'robots'
+    if site_record['ToS']:
+        return 'tos'
+    return 'failed'
+
+def siteRecord(url, links = None, status = None, redirect = None, duration = None, robots = False, ToS = False, Repeat = False, nogo = False):
+    """
+    Function to make an entry for sites_dict. See 'Format for sites_dict' below.
+    Inputs: url (str), and any of the fields that differ from the defaults.
+    Output: (dict)
+    """
+    return {'url':url,
+            'links':links,
+            'status':status,
+            'redirect':redirect,
+            'duration':duration,
+            'robots':robots,
+            'ToS':ToS,
+            'Repeat':Repeat,
+            'nogo':nogo}
+
+class UrlTable():
+    """
+    Gives every distinct URL an integer ID, so that each URL string is only stored once.
+    """
+
+    def __init__(self):
+        self.ids = {}                                                           # url: ID
+        self.urls = []                                                          # ID: url
+
+    def intern(self, url):
+        """
+        Function to get the ID of a URL, giving it a new one if it doesn't have one yet.
+        Input: url (str)
+        Output: (int)
+        """
+        url_id = self.ids.get(url)
+        if url_id is None:
+            url_id = len(self.urls)
+            self.ids[url] = url_id
+            self.urls.append(url)
+        return url_id
+
+    def get_id(self, url):
+        """
+        Function to get the ID of a URL without adding it.
+        Input: url (str)
+        Output: (int), or None if the URL has no ID.
+        """
+        return self.ids.get(url)
+
+    def url(self, url_id):
+        return self.urls[url_id]
+
+    def __len__(self):
+        return len(self.urls)
+
+class CrawlRecords():
+    """
+    Compact store of the crawl records (the entries of sites_dict), one typed array per field.
+    URLs are interned in a UrlTable and the links of all sites are kept, as URL IDs, in one shared array.
+    A record takes a few dozen bytes instead of a dict with nine keys and a list of URL strings.
+    Records are numbered from 1, like the keys of sites_dict.
+    """
+
+    FLAG_ROBOTS = 1
+    FLAG_TOS = 2
+    FLAG_REPEAT = 4
+    FLAG_NOGO = 8
+
+    def __init__(self, url_table = None):
+        if url_table is None:
+            url_table = UrlTable()
+        self.urls = url_table                                                   # UrlTable of every URL in the records
+        self.url_ids = array('q')                                               # ID of the url of each record
+        self.status = array('h')                                                # HTTP status code. -1 for None
+        self.redirect = array('b')                                              # 1 if redirected, 0 if not, -1 for None
+        self.duration = array('d')                                              # Seconds. NaN for None
+        self.flags = array('B')                                                 # FLAG_ROBOTS | FLAG_TOS | FLAG_REPEAT | FLAG_NOGO
+        self.link_start = array('q')                                            # Where the links of each record start in self.links
+        self.link_count = array('l')                                            # Number of links of each record. -1 for None (site not visited)
+        self.links = array('q')                                                 # URL IDs of the links of all records, one after the other
+
+    def __len__(self):
+        return len(self.url_ids)
+
+    def append(self, site_record):
+        """
+        Function to add a record.
+        Input: site_record (dict), as made by siteRecord
+        Output: (int), the number of the record (its key in sites_dict)
+        """
+        self.url_ids.append(self.urls.intern(site_record['url']))
+        self.status.append(-1 if site_record['status'] is None else site_record['status'])
+        self.redirect.append(-1 if site_record['redirect'] is None else int(site_record['redirect']))
+        self.duration.append(math.nan if site_record['duration'] is None else site_record['duration'])
+        self.flags.append((self.FLAG_ROBOTS if site_record['robots'] else 0)
+                          | (self.FLAG_TOS if site_record['ToS'] else 0)
+                          | (self.FLAG_REPEAT if site_record['Repeat'] else 0)
+                          | (self.FLAG_NOGO if site_record['nogo'] else 0))
+        self.link_start.append(len(self.links))
+        if site_record['links'] is None:
+            self.link_count.append(-1)
+        else:
+            self.link_count.append(len(site_record['links']))
+            self.links.extend(self.urls.intern(link) for link in site_record['links'])
+        return len(self.url_ids)
+
+    def link_ids(self, attempt):
+        """
+        Function to get the links of a record as URL IDs.
+        Input: attempt (int), the number of the record
+        Output: (array of int), or None if the site wasn't visited.
+        """
+        i = attempt - 1
+        if self.link_count[i] < 0:
+            return None
+        return self.links[self.link_start[i]:self.link_start[i] + self.link_count[i]]
+
+    def visited(self, attempt):
+        """
+        Function to check whether the site of a record was visited (and so has links).
+        Input: attempt (int)
+        Output: (Bool)
+        """
+        return self.link_count[attempt - 1] >= 0
+
+    def url(self, attempt):
+        return self.urls.url(self.url_ids[attempt - 1])
+
+    def as_dict(self, attempt):
+        """
+        Function to rebuild a record as a dict, in the format of sites_dict.
+        Input: attempt (int), the number of the record
+        Output: (dict)
+        """
+        i = attempt - 1
+        if not 0 <= i < len(self.url_ids):
+            raise KeyError(attempt)
+        link_ids = self.link_ids(attempt)
+        flags = self.flags[i]
+        return siteRecord(self.urls.url(self.url_ids[i]),
+                          links = None if link_ids is None else [self.urls.url(link_id) for link_id in link_ids],
+                          status = None if self.status[i] < 0 else self.status[i],
+                          redirect = None if self.redirect[i] < 0 else bool(self.redirect[i]),
+                          duration = None if math.isnan(self.duration[i]) else self.duration[i],
+                          robots = bool(flags & self.FLAG_ROBOTS),
+                          ToS = bool(flags & self.FLAG_TOS),
+                          Repeat = bool(flags & self.FLAG_REPEAT),
+                          nogo = bool(flags & self.FLAG_NOGO))
+
+class SitesDictView(Mapping):
+    """
+    Read-only view of CrawlRecords that looks like the old sites_dict: {attempt: {'url':..., 'links':..., ...}}.
+    Each dict is only built when it is asked for.
+    """
+
+    def __init__(self, records):
+        self.records = records
+
+    def __getitem__(self, attempt):
+        if not isinstance(attempt, int):
+            raise KeyError(attempt)
+        return self.records.as_dict(attempt)
+
+    def __iter__(self):
+        return iter(range(1, len(self.records) + 1))
+
+    def __len__(self):
+        return len(self.records)
+
+#-0-0--0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0--0-0-0-0-0-0--0-0-0-0-0-0-0-0-0-0-0
+#-0-0--0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0--0-0-0-0-0-0--0-0-0-0-0-0-0-0-0-0-0
+# Format for sites_dict (built on demand from the columns of CrawlRecords):
+# {'url':(string),              - The url of this site, in string form.
+# 'links':(NoneType),           - The links from this site. Will be a list of strings.
+# 'status':(NoneType),          - The HTTP status code, 2xx, 3xx, 4xx, 5xx etc. Integers
+# 'redirect':(NoneType),        - Whether or not we have been redirected. Bool, True if redirected
+# 'duration':(NoneType),        - Returns a float with the time, in seconds, elapsed between making and receiving request contents.
+# 'robots':(Bool),              - Are we prohibited from crawling due to the /robots.txt file? True if prohibited
+# 'ToS':(Bool),                 - Are we prohibited from crawling due to the ToS? True if prohibited
+# 'Repeat':(Bool),              - Is this site a repeat of a previous one? True if so. (Repeats are now dropped by the frontier, so this stays False.)
+# 'no-go':(Bool)}               - Is this a no-go site? True if so.
+#-0-0--0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0--0-0-0-0-0-0--0-0-0-0-0-0-0-0-0-0-0
+#-0-0--0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0-0--0-0-0-0-0-0--0-0-0-0-0-0-0-0-0-0-0
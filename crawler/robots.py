@@ -0,0 +1,289 @@
+# Robots.txt rules and per-host cache.
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# From: https://stackoverflow.com/questions/54372218/how-to-split-a-list-into-sublists-based-on-a-separator-similar-to-str-split
+# This is a generator, we can call this multiple times to give the sublists we want.
+def list_splitter(list_to_split, delimiter):
+    """
+    Generator that gives sublists from a list.
+    Inputs: list_to_split (list):
+            delimiter: where splits should be done. Won't appear in sublists
+    Output: sublist
+    """
+    sublist = []                                    # Set up an empty sublist
+    for var in list_to_split:                       # Loop over the list to split
+        if var == delimiter:                        # If we have reached the delimiter
+            yield sublist                           # Return the sublist as assembled so far
+            sublist = []                            # Reset the sublist (I think the next call will start from here, since it is a generator)
+        else:                                       # If we are not yet at the delimiter
+            sublist.append(var)                     # Add the current element to the sublist
+    yield sublist                                   # For the last sublist. Or if there are no delimiters.
+
+def robotsPatternToRegex(el):
+    """
+    Function to turn a robots.txt path (eg. '/food/recipes*') into a regular expression string.
+    Input: el (str), the target of an Allow/Disallow line.
+    Output: (str), a regular expression, anchored with '^' at the start.
+    """
+    # Strip whitespace
+    el = el.strip(' ')
+    # Ends with '*' -> remove, it means the same as not being there.
+    while el.endswith('*'):
+        el = el[:-1]
+    # A '$' at the very end has a meaning (end of the URL), anywhere else it is just a character.
+    endAnchor = el.endswith('$')
+    if endAnchor:
+        el = el[:-1]
+    # Protect all the characters that have special RegEx meanings, then give '*' back its meaning of 'any string'.
+    el = re.escape(el).replace(r'\*', '.*')
+    if endAnchor:
+        el = el + '$'
+    # Then add '^' at the start
+    return '^' + el
+
+class RobotsRules():
+    """
+    Compiled /robots.txt rules for a single host.
+    Built once per host by parseRobots, then used for every URL on that host.
+    Follows the precedence of Google's robots.txt spec: the most specific (longest) matching rule wins, and Allow wins
+    a tie between equally long rules. A path that no rule matches is allowed.
+    As in RFC 9309, a 4xx for the robots file means there is no file, so everything is allowed. Any other status that
+    isn't a 2xx (a 5xx, or 429 Too Many Requests) means the host is unreachable, so nothing is.
+    So that a URL isn't checked against every rule, the rules are indexed by their literal prefix (the part before
+    any '*' or '$'), in one dict per prefix length. A path is looked up by its own prefixes of those lengths, and only
+    the rules found there are looked at: plain rules match just by being found, the others are checked with their regex.
+    """
+
+    def __init__(self, status, disallow_list=(), allow_list=(), crawl_delay=None, comments=''):
+        self.status = status                                                    # HTTP status code of the robots request (int)
+        self.crawl_delay = crawl_delay                                          # Crawl-delay from the file, in seconds. None if not given.
+        self.comments = comments                                                # All comments from the file, as one string
+        self.refused = False                                                    # True if we decided not to crawl the host after reading the comments
+        self.unreachable = status // 100 not in (2, 4) or status == 429         # True if we couldn't get the robots file (see above)
+        self.rules = {}                                                         # prefix length: {prefix: [(length, allow, regex or None), ...]}, most specific first
+        self.longest = {}                                                       # prefix length: length of the longest rule with a prefix that long
+
+        for allow, patterns in ((False, disallow_list), (True, allow_list)):
+            for pattern in patterns:
+                pattern = pattern.strip(' ')
+                if not pattern:                                                 # A statement: 'Disallow: '. Disallowing nothing
+                    continue
+                path = pattern.rstrip('*')                                      # A '*' at the end means the same as not being there
+                length = len(path)                                              # How specific the rule is
+                prefix = re.split(r'[*$]', path, 1)[0]
+                regex = None                                                    # A plain prefix, eg. 'Disallow: /' -> '/', which matches everything
+                if prefix != path:                                              # Wildcards, or a '$' at the end
+                    regex = re.compile(robotsPatternToRegex(pattern))
+                self.rules.setdefault(len(prefix), {}).setdefault(prefix, []).append((length, allow, regex))
+                self.longest[len(prefix)] = max(self.longest.get(len(prefix), 0), length)
+
+        for rules in self.rules.values():
+            for candidates in rules.values():
+                candidates.sort(key = lambda rule: (-rule[0], not rule[1]))    # Longest first, Allow first in a tie
+        self.prefix_lengths = sorted(self.rules, reverse = True)
+
+    def decide(self, tExtension):
+        """
+        Function to find the most specific rule that matches a path.
+        Input: tExtension (str), the part of the URL after the host, eg. '/a/b?c=d'
+        Output: crawlable (Bool), True if allowed (or no rule matches). False if prohibited.
+        """
+        best_length, crawlable = -1, True
+        for prefix_length in self.prefix_lengths:
+            if self.longest[prefix_length] < best_length:                       # Nothing here can beat what we have
+                continue
+            candidates = self.rules[prefix_length].get(tExtension[:prefix_length])
+            if candidates is None:
+                continue
+            for length, allow, regex in candidates:                            # Most specific first, so the first match is the one
+                if length < best_length or (length == best_length and (crawlable or not allow)):
+                    break
+                if regex is None or regex.match(tExtension):
+                    best_length, crawlable = length, allow
+                    break
+        return crawlable
+
+    def is_allowed(self, tExtension):
+        """
+        Function to check a path against the rules.
+        Input: tExtension (str), the part of the URL after the host, eg. '/a/b?c=d'
+        Output: crawlable (Bool), True if allowed. False if prohibited.
+        """
+        # If we couldn't get the robots file (or chose not to continue), nothing on the host is crawled.
+        if self.unreachable or self.refused:
+            return False
+        return self.decide(tExtension)
+
+    def allowed_paths(self, tExtensions):
+        """
+        Function to check many paths of the host at once, eg. all the links of a page to this host.
+        Input: tExtensions (iterable of str)
+        Output: (list of Bool), True for each path that is allowed.
+        """
+        if self.unreachable or self.refused:
+            return [False for _ in tExtensions]
+        decide = self.decide
+        return [decide(tExtension) for tExtension in tExtensions]
+
+def parseRobots(robots_text, status):
+    """
+    Function to turn the text of a /robots.txt file into a compiled rule set.
+    We are only interested in the User-Agent '*' or 'CustomCrawler(+https://www.mycustomcrawlerexplanations.com)'.
+    If there is a record for CustomCrawler, it is used instead of the '*' record.
+    Inputs: robots_text (str), the content of the robots file
+            status (int), the status code of the robots request
+    Output: rules (RobotsRules)
+    """
+    robots_list = [line.strip() for line in robots_text.split('\n')]            # Strip spaces and '\r's
+
+    comment_string = ''
+    records = {'*':{'disallow':[], 'allow':[], 'crawl-delay':None},
+               'customcrawler':{'disallow':[], 'allow':[], 'crawl-delay':None}}
+    found_own_record = False
+
+    # A group (record) is one or more User-agent lines followed by its rules, as in RFC 9309. A User-agent line after a
+    # rule starts the next group. Empty lines don't matter: 'User-agent: *', an empty line, 'Disallow: /a' is one group.
+    applies_to = []                                                             # Records of the current group that are ours
+    in_rules = False                                                            # True once the current group has had a rule
+    for element in robots_list:
+        if element.startswith('#'):
+            comment_string += element                                           # Making a string of all comments.
+            continue
+        element = element.split('#', 1)[0]                                      # Comments at the end of a line
+        field, sep, value = element.partition(':')                              # Only split on the first ':', targets can contain them too.
+        if not sep:
+            continue
+        field = field.strip().lower()
+        value = value.strip()
+
+        if field == 'user-agent':
+            if in_rules:                                                        # A new group
+                applies_to = []
+                in_rules = False
+            agent = value.lower()
+            if agent == '*':
+                applies_to.append('*')
+            elif agent.startswith('customcrawler'):
+                applies_to.append('customcrawler')
+                found_own_record = True
+        elif field in ('disallow', 'allow'):
+            in_rules = True
+            for agent in applies_to:
+                records[agent][field].append(value)
+        elif field == 'crawl-delay':
+            in_rules = True
+            try:
+                delay = float(value.strip(' .'))
+            except ValueError:
+                continue
+            for agent in applies_to:
+                records[agent]['crawl-delay'] = delay
+
+    if found_own_record:
+        record = records['customcrawler']
+    else:
+        record = records['*']
+    return RobotsRules(status, record['disallow'], record['allow'], record['crawl-delay'], comment_string)
+
+def cacheTtlFromHeaders(headers, default_ttl, min_ttl = 0, max_ttl = None):
+    """
+    Function to work out how long a response may be cached for, using its HTTP cache headers.
+    Looks at Cache-Control (no-store, no-cache, s-maxage, max-age) and then Expires/Date.
+    Inputs: headers (dict-like, case insensitive, eg. response.headers). May be None.
+            default_ttl (float), seconds to use if the headers say nothing.
+            min_ttl (float), lower bound on the result.
+            max_ttl (float), upper bound on the result. None for no bound.
+    Output: ttl (float), seconds.
+    """
+    ttl = default_ttl
+    if headers:
+        directives = {}
+        for part in headers.get('Cache-Control', '').split(','):
+            name, _, value = part.strip().partition('=')
+            directives[name.lower()] = value.strip(' "')
+
+        if 'no-store' in directives or 'no-cache' in directives:
+            ttl = 0
+        elif directives.get('s-maxage') or directives.get('max-age'):           # A bare 's-maxage' (no '=value') says nothing
+            for name in ('s-maxage', 'max-age'):
+                try:
+                    ttl = float(directives.get(name) or '')
+                    break
+                except ValueError:
+                    continue
+        elif headers.get('Expires'):
+            try:
+                expires = parsedate_to_datetime(headers.get('Expires'))
+                if headers.get('Date'):
+                    now = parsedate_to_datetime(headers.get('Date'))
+                else:
+                    now = datetime.now(timezone.utc)
+                ttl = (expires - now).total_seconds()
+            except (TypeError, ValueError):                                     # Expires: 0, or some date we can't read -> already expired
+                ttl = 0
+
+    ttl = max(ttl, min_ttl)
+    if max_ttl is not None:
+        ttl = min(ttl, max_ttl)
+    return ttl
+
+class RobotsCache():
+    """
+    Per-host cache of compiled robots.txt rules, keyed by scheme + host (eg. 'https://www.abcd.com').
+    Entries expire according to the HTTP cache headers of the robots response, and the least recently
+    used host is dropped when the cache is full.
+    """
+
+    def __init__(self, max_hosts = 1000, default_ttl = 86400, min_ttl = 60, max_ttl = 86400, error_ttl = 300):
+        self.entries = OrderedDict()                                            # root_url: (expiry time, RobotsRules). Least recently used first.
+        self.max_hosts = max_hosts                                              # Number of hosts to keep rules for
+        self.default_ttl = default_ttl                                          # Seconds to keep rules for if the server gives no cache headers. Google uses 24 hours.
+        self.min_ttl = min_ttl                                                  # Even with 'no-cache', don't fetch the robots file more often than this.
+        self.max_ttl = max_ttl                                                  # Never keep rules for longer than this.
+        self.error_ttl = error_ttl                                              # Seconds to remember a 5xx (or 429). Assumed temporary, so we try again sooner.
+        self.lock = threading.Lock()                                            # The cache is shared by the threads of the crawl engine
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, root_url):
+        return self.get(root_url) is not None
+
+    def get(self, root_url):
+        """
+        Function to look up the rules for a host.
+        Input: root_url (str), eg. 'https://www.abcd.com'
+        Output: rules (RobotsRules), or None if we have no fresh rules for this host.
+        """
+        with self.lock:
+            entry = self.entries.get(root_url)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():                                    # Expired
+                del self.entries[root_url]
+                return None
+            self.entries.move_to_end(root_url)                                  # Most recently used goes to the end
+            return entry[1]
+
+    def put(self, root_url, rules, headers = None):
+        """
+        Function to store the rules for a host.
+        Inputs: root_url (str), eg. 'https://www.abcd.com'
+                rules (RobotsRules)
+                headers (dict-like), headers of the robots response. Used for the expiry time.
+        """
+        if rules.unreachable:
+            ttl = self.error_ttl
+        else:
+            ttl = cacheTtlFromHeaders(headers, self.default_ttl, self.min_ttl, self.max_ttl)
+        with self.lock:
+            self.entries[root_url] = (time.monotonic() + ttl, rules)
+            self.entries.move_to_end(root_url)
+            while len(self.entries) > self.max_hosts:                           # Evict the least recently used hosts
+                self.entries.popitem(last = False)
@@ -0,0 +1,313 @@
+# HTTP sessions: kept-alive connections per host, with a shared DNS cache.
+
+import ipaddress
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import requests
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+from .urls import splitRootUrl
+
+def systemResolver(host):
+    """
+    Function to resolve a host name with the system resolver (getaddrinfo). The default resolver of a DnsCache.
+    Input: host (str), eg. 'www.abcd.com'
+    Outputs: addresses (list of str), IP addresses, in the order to try them. Raises socket.gaierror if there are none.
+             ttl (int), seconds the addresses are good for. None, getaddrinfo doesn't say.
+    """
+    addresses = []
+    for _, _, _, _, sockaddr in socket.getaddrinfo(host, None, allowed_gai_family(), socket.SOCK_STREAM):
+        if sockaddr[0] not in addresses:
+            addresses.append(sockaddr[0])
+    return addresses, None
+
+class DnsCache():
+    """
+    In-process cache of host name lookups, shared by all connections of a crawl, so that a host is resolved once per ttl
+    instead of for every connection. Failed lookups are cached too, for negative_ttl.
+    Lookups run on a pool of worker threads: prefetch() starts them when links are queued, so by the time a host is
+    visited its addresses are usually known. A connection that needs a host being looked up waits for that lookup.
+    The resolver can be replaced (eg. by a stub, for tests): resolver(host) gives (addresses, ttl), see systemResolver.
+    """
+
+    def __init__(self, resolver = None, ttl = 300, negative_ttl = 60, max_hosts = 10000, workers = 4, max_pending = 1000, metrics = None):
+        self.resolver = resolver or systemResolver
+        self.ttl = ttl                                                          # Seconds to keep addresses, if the resolver doesn't say
+        self.negative_ttl = negative_ttl                                        # Seconds to remember that a host couldn't be resolved
+        self.max_hosts = max_hosts                                              # Hosts to keep
+        self.max_pending = max_pending                                          # Prefetches beyond this many lookups in progress are dropped
+        self.metrics = metrics
+        self.entries = OrderedDict()                                            # host: (expiry time, addresses or socket.gaierror). Least recently used first.
+        self.pending = {}                                                       # host: Future of the lookup in progress
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix = 'dns')
+
+    @staticmethod
+    def is_address(host):
+        """
+        Function to tell IP addresses (which need no lookup) from host names.
+        Input: host (str)
+        Output: (Bool)
+        """
+        try:
+            ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return True
+
+    def cached(self, host):
+        """
+        Function to get the cached result for a host. Call with self.lock held.
+        Output: addresses (list of str) or socket.gaierror. None if there is no fresh result.
+        """
+        entry = self.entries.get(host)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self.entries[host]
+            return None
+        self.entries.move_to_end(host)
+        return entry[1]
+
+    def lookup(self, host):
+        """
+        Function to resolve a host with the resolver, and cache the result. Runs on the worker threads.
+        Input: host (str)
+        Output: addresses (list of str). Raises socket.gaierror if the host couldn't be resolved.
+        """
+        try:
+            try:
+                addresses, ttl = self.resolver(host)
+                if not addresses:
+                    raise socket.gaierror(socket.EAI_NONAME, 'No addresses for ' + host)
+                result, ttl = list(addresses), self.ttl if ttl is None else ttl
+            except (socket.gaierror, UnicodeError) as lookup_error:
+                if not isinstance(lookup_error, socket.gaierror):
+                    lookup_error = socket.gaierror(socket.EAI_NONAME, str(lookup_error))
+                result, ttl = lookup_error, self.negative_ttl
+            with self.lock:
+                self.entries[host] = (time.monotonic() + ttl, result)
+                self.entries.move_to_end(host)
+                while len(self.entries) > self.max_hosts:
+                    self.entries.popitem(last = False)
+        finally:
+            with self.lock:
+                self.pending.pop(host, None)
+        if isinstance(result, socket.gaierror):
+            raise result
+        return result
+
+    def start(self, host):
+        """
+        Function to start looking a host up, unless it is cached or being looked up already. Call with self.lock held.
+        Output: Future of the lookup, None if the host is cached.
+        """
+        if self.cached(host) is not None:
+            return None
+        future = self.pending.get(host)
+        if future is None:
+            future = self.executor.submit(self.lookup, host)
+            self.pending[host] = future
+        return future
+
+    def resolve(self, host):
+        """
+        Function to get the addresses of a host: from the cache, or by waiting for its lookup.
+        Input: host (str), eg. 'www.abcd.com'. IP addresses are given back as they are.
+        Output: addresses (list of str). Raises socket.gaierror if the host couldn't be resolved.
+        """
+        if self.is_address(host):
+            return [host]
+        host = host.rstrip('.').lower()
+        with self.lock:
+            result = self.cached(host)
+            future = self.start(host) if result is None else None
+        if future is not None:
+            if self.metrics is not None:
+                self.metrics.inc('crawler_dns_lookups_total', label = 'miss')
+                with self.metrics.stage('dns'):
+                    return future.result()
+            return future.result()
+        if self.metrics is not None:
+            self.metrics.inc('crawler_dns_lookups_total', label = 'negative' if isinstance(result, socket.gaierror) else 'hit')
+        if isinstance(result, socket.gaierror):
+            raise result
+        return result
+
+    def prefetch(self, hosts):
+        """
+        Function to start looking hosts up in the background, so their addresses are cached by the time they are visited.
+        Input: hosts (iterable of str)
+        """
+        with self.lock:
+            for host in hosts:
+                if len(self.pending) >= self.max_pending:
+                    break
+                host = host.rstrip('.').lower()
+                if host and not host.startswith('[') and not self.is_address(host):   # IPv6 addresses are in []
+                    self.start(host)
+
+    def close(self):
+        self.executor.shutdown(wait = False, cancel_futures = True)
+
+class ConnectTimer():
+    """
+    Mixin for urllib3 connections that times connect() (DNS lookup, TCP and TLS handshakes) as the 'connect' stage,
+    and looks host names up in a DnsCache instead of asking the system resolver for every connection.
+    The Metrics and DnsCache come in as keyword arguments, which urllib3 passes from the connection pool to its connections.
+    """
+
+    def __init__(self, *args, metrics = None, dns = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = metrics
+        self.dns = dns
+
+    def connect(self):
+        if self.metrics is None:
+            return super().connect()
+        with self.metrics.stage('connect'):
+            return super().connect()
+
+    def _new_conn(self):
+        if self.dns is None:
+            return super()._new_conn()
+        try:
+            addresses = self.dns.resolve(self._dns_host)
+        except socket.gaierror as dns_error:
+            raise NameResolutionError(self.host, self, dns_error) from dns_error
+        # urllib3 connects to _dns_host. Given an IP address, it doesn't ask the system resolver.
+        # The host name is put back before the TLS handshake, which needs it.
+        host_name = self._dns_host
+        try:
+            for position, address in enumerate(addresses):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except NewConnectionError:                                      # Try the next address, as getaddrinfo users do
+                    if position == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = host_name
+
+class TimedHTTPConnection(ConnectTimer, HTTPConnection):
+    pass
+
+class TimedHTTPSConnection(ConnectTimer, HTTPSConnection):
+    pass
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+class TimedAdapter(requests.adapters.HTTPAdapter):
+    """
+    HTTPAdapter whose connections time how long they take to connect, into a Metrics, and resolve host names with a DnsCache.
+    Either can be None.
+    """
+
+    def __init__(self, metrics, dns = None, **kwargs):
+        self.metrics = metrics                                                  # Set first: HTTPAdapter.__init__ calls init_poolmanager
+        self.dns = dns
+        requests.adapters.HTTPAdapter.__init__(self, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        requests.adapters.HTTPAdapter.init_poolmanager(self, *args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http':partial(TimedHTTPConnectionPool, metrics = self.metrics, dns = self.dns),
+                                                   'https':partial(TimedHTTPSConnectionPool, metrics = self.metrics, dns = self.dns)}
+
+class SessionPool():
+    """
+    One requests.Session per site root (scheme + host), so that requests to the same host reuse a kept-alive connection
+    instead of paying for a new TCP and TLS handshake every time.
+    To keep the load on servers low, a host's connections are closed once it has been idle for idle_timeout seconds,
+    and only the max_hosts most recently used hosts keep a session at all.
+    """
+
+    def __init__(self, headers = None, pool_maxsize = 1, max_hosts = 100, timeout = (10, 30), idle_timeout = 30, metrics = None, dns = None):
+        self.headers = headers or {}                                            # Sent with every request, eg. our User-Agent
+        self.metrics = metrics                                                  # Metrics the connect times go to, if any
+        self.dns = dns                                                          # DnsCache host names are resolved with. None for the system resolver.
+        self.pool_maxsize = pool_maxsize                                        # Connections kept per host. The crawl engine only uses one at a time.
+        self.max_hosts = max_hosts                                              # Hosts that keep a session
+        self.timeout = timeout                                                  # (connect, read) timeout in seconds for every request
+        self.idle_timeout = idle_timeout                                        # Close a host's connections after this many seconds without a request. 0 closes them after each request.
+        self.sessions = OrderedDict()                                           # root_url: [session, time last used, requests in progress]. Least recently used first.
+        self.lock = threading.Lock()
+
+    def new_session(self):
+        """
+        Function to make a session with our headers and a connection pool of pool_maxsize.
+        Output: requests.Session
+        """
+        session = requests.Session()
+        session.headers.update(self.headers)
+        if self.metrics is None and self.dns is None:
+            adapter = requests.adapters.HTTPAdapter(pool_connections = 1, pool_maxsize = self.pool_maxsize)
+        else:
+            adapter = TimedAdapter(self.metrics, self.dns, pool_connections = 1, pool_maxsize = self.pool_maxsize)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def get(self, url, stream = False, headers = None):
+        """
+        Function to make a GET request through the session of the url's host.
+        Inputs: url (str)
+                stream (Bool), passed on to requests
+                headers (dict), sent with this request only, on top of self.headers
+        Output: requests.response object. Closing it gives the connection back to the pool.
+        """
+        root_url, _ = splitRootUrl(url)
+        with self.lock:
+            entry = self.sessions.get(root_url)
+            if entry is None:
+                entry = [self.new_session(), time.monotonic(), 0]
+                self.sessions[root_url] = entry
+            self.sessions.move_to_end(root_url)
+            entry[2] += 1
+        try:
+            return entry[0].get(url, stream = stream, timeout = self.timeout, headers = headers)
+        finally:
+            with self.lock:
+                entry[1] = time.monotonic()
+                entry[2] -= 1
+            self.close_idle()
+
+    def close_idle(self):
+        """
+        Function to close the sessions of hosts that have been idle for idle_timeout seconds, and of the least recently used
+        hosts if there are more than max_hosts.
+        """
+        to_close = []
+        with self.lock:
+            now = time.monotonic()
+            for root_url, entry in list(self.sessions.items()):                 # Least recently used first
+                if entry[2] > 0:
+                    continue
+                if now - entry[1] >= self.idle_timeout or len(self.sessions) > self.max_hosts:
+                    del self.sessions[root_url]
+                    to_close.append(entry[0])
+                else:
+                    break                                                       # Everything after this was used more recently
+        for session in to_close:
+            session.close()
+
+    def close(self):
+        """
+        Function to close every session.
+        """
+        with self.lock:
+            sessions = [entry[0] for entry in self.sessions.values()]
+            self.sessions.clear()
+        for session in sessions:
+            session.close()
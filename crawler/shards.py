@@ -0,0 +1,397 @@
+# Sharded crawling.
+
+import asyncio
+import bisect
+import hashlib
+import os
+import queue
+import threading
+from multiprocessing import Process
+from multiprocessing.managers import BaseManager
+
+from .cache import ResponseCache
+from .core import Crawler
+from .engine import AsyncCrawlEngine
+from .frontier import SeenSet, parseScorers
+from .policy import RulePolicy, TermsCache
+from .urls import hostOfUrl, splitRootUrl
+
+class HashRing():
+    """
+    Consistent hash ring that gives each host to one of num_shards shards.
+    Every shard has `replicas` points on the ring, and a host belongs to the shard of the first point after its hash.
+    Hashing uses blake2b, so every process (and every machine) gives a host to the same shard.
+    """
+
+    def __init__(self, num_shards, replicas = 64):
+        self.num_shards = num_shards
+        points = sorted((self.hash('shard-%d-%d' % (shard, replica)), shard) for shard in range(num_shards) for replica in range(replicas))
+        self.points = [point for point, _ in points]                           # Sorted hashes of the points on the ring
+        self.shards = [shard for _, shard in points]                           # Shard of each point
+
+    @staticmethod
+    def hash(key):
+        return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size = 8).digest(), 'big')
+
+    def owner(self, host):
+        """
+        Function to find the shard a host belongs to.
+        Input: host (str), eg. 'www.abcd.com:8080'
+        Output: (int), the shard
+        """
+        i = bisect.bisect(self.points, self.hash(host))
+        return self.shards[i % len(self.points)]
+
+    def url_owner(self, url):
+        """
+        Function to find the shard of a site, from its host (with the port, like the HostScheduler).
+        Sites without a host (eg. 'mailto:') go by the whole URL, so they are still only recorded once.
+        Input: url (str)
+        Output: (int), the shard
+        """
+        if '//' not in url:
+            return self.owner(url)
+        return self.owner(hostOfUrl(splitRootUrl(url)[0], with_port = True))
+
+class ShardState():
+    """
+    State shared by all the shards of a crawl. Lives in the coordinator and is used by the shards through a ShardBroker.
+    Keeps the number of sites to visit across all shards (a shard claims a visit before it starts a site),
+    and works out when the crawl is finished: no shard is visiting a site, no links are on their way to a shard,
+    and either the sites to visit are used up or no shard has anything left to visit.
+    """
+
+    def __init__(self, settings, metrics = None):
+        self.lock = threading.Lock()
+        self.crawl_settings = settings                                          # Settings for ShardCrawler, see ShardedCrawl.shard_settings
+        self.metrics = metrics                                                  # Metrics of the coordinator, the shards add theirs when they stop
+        self.num_shards = settings['num_shards']
+        self.num_to_visit = settings['num_to_visit']
+        self.claimed = 0                                                        # Visits claimed (being visited, or visited) across all shards
+        self.sent = 0                                                           # Batches of links put on the inboxes of shards
+        self.received = 0                                                       # Batches of links taken off the inboxes by shards
+        self.running = [False] * self.num_shards                                # Shards that are visiting sites
+        self.has_work = [False] * self.num_shards                               # Shards with sites left to visit
+        self.stopped = False
+
+    def settings(self):
+        return self.crawl_settings
+
+    def claim(self, shard):
+        """
+        Function to claim one of the sites to visit, before a shard starts a site.
+        Input: shard (int)
+        Output: (Bool), False if all sites to visit have been claimed, or the crawl is stopped.
+        """
+        with self.lock:
+            if self.stopped or self.claimed >= self.num_to_visit:
+                return False
+            self.claimed += 1
+            self.running[shard] = True
+            return True
+
+    def release(self):
+        """
+        Function to give back a claim that wasn't used (no site was started, or it wasn't visited).
+        """
+        with self.lock:
+            self.claimed -= 1
+
+    def send(self, batches):
+        """
+        Function to count batches of links before they are put on the inbox of a shard.
+        Input: batches (int)
+        """
+        with self.lock:
+            self.sent += batches
+
+    def receive(self, shard, batches, has_work):
+        """
+        Function to count batches of links a shard has taken off its inbox, and whether it now has sites to visit.
+        Inputs: shard (int)
+                batches (int)
+                has_work (Bool)
+        """
+        with self.lock:
+            self.received += batches
+            self.has_work[shard] = has_work
+
+    def idle(self, shard, has_work):
+        """
+        Function called by a shard that isn't visiting any sites.
+        Inputs: shard (int)
+                has_work (Bool), whether it has sites left to visit
+        Output: (Bool), True if the crawl is finished and the shard should stop.
+        """
+        with self.lock:
+            self.running[shard] = False
+            self.has_work[shard] = has_work
+            return self.stopped
+
+    def check(self):
+        """
+        Function to check whether the crawl is finished, and stop it if it is.
+        Output: (Bool), True if the crawl is finished.
+        """
+        with self.lock:
+            if not self.stopped and self.sent == self.received and not any(self.running):
+                if self.claimed >= self.num_to_visit or not any(self.has_work):
+                    self.stopped = True
+            return self.stopped
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+
+    def add_metrics(self, snapshot):
+        """
+        Function for a shard to add its metrics (a Metrics.snapshot) to the coordinator's.
+        Input: snapshot (dict)
+        """
+        if self.metrics is not None:
+            self.metrics.merge(snapshot)
+
+class ShardBroker(BaseManager):
+    """
+    Connection to the ShardState, the inboxes and the results queue of a sharded crawl, from a shard process.
+    The coordinator serves them on a TCP address (see ShardedCrawl.serve), so shards can also run on other machines.
+    """
+    pass
+
+ShardBroker.register('state')
+ShardBroker.register('inbox')
+ShardBroker.register('results')
+
+class ShardCrawler(Crawler):
+    """
+    Crawler for one shard of a sharded crawl. It visits only the hosts that the HashRing gives to its shard,
+    with its own frontier, robots cache and politeness state. Links to hosts of other shards are sent to the inbox of their
+    shard, in one batch per shard for each site. The records are put on the results queue instead of being kept here,
+    the coordinator merges them into one network.
+    """
+
+    def __init__(self, shard, ring, inboxes, results, state, num_to_visit, secured, no_goes, policy, bloom_capacity = None, scorers = None):
+        Crawler.__init__(self, None, num_to_visit, secured, no_goes, policy, bloom_capacity, scorers)
+        self.shard = shard                                                      # Number of this shard
+        self.ring = ring                                                        # HashRing that gives hosts to shards
+        self.inboxes = inboxes                                                  # Inbox queue of each shard
+        self.results = results                                                  # Queue the records go to
+        self.state = state                                                      # ShardState (through the broker)
+        self.forwarded = SeenSet(bloom_capacity)                                # Sites already sent to other shards. Each is only sent once.
+
+    def record(self, target, site_record, links):
+        self.counter_attempts += 1
+        self.results.put(site_record)                                           # The outcome is counted by the coordinator, when it merges the record
+        if links is not None:
+            with self.metrics.stage('enqueue'):
+                added = self.enqueue(links, target)
+            self.metrics.inc('crawler_enqueued_total', added)
+            self.counter_total += 1
+
+    def enqueue(self, urls, source = None):
+        """
+        Function to add the sites of this shard to the frontier, and send the others to their shards. Sites we don't
+        want to visit are dropped first, so they aren't sent.
+        Sites sent to another shard arrive there without their source, so a PriorityFrontier counts them as seeds.
+        Inputs: urls (iterable of str)
+                source (str), the site they were found on
+        Output: (int), the number of sites added here or sent.
+        """
+        local_urls = []
+        batches = {}                                                            # shard: list of urls
+        for url in self.filter_urls(urls):
+            shard = self.ring.url_owner(url)
+            if shard == self.shard:
+                local_urls.append(url)
+            else:
+                url = self.forwarded.add(url)
+                if url is not None:
+                    batches.setdefault(shard, []).append(url)
+        if batches:
+            self.state.send(len(batches))                                       # Counted before they are sent, so the crawl can't look finished while they are on their way
+            for shard, batch in batches.items():
+                self.inboxes[shard].put(batch)
+        return Crawler.enqueue(self, local_urls, source) + sum(len(batch) for batch in batches.values())
+
+class ShardEngine(AsyncCrawlEngine):
+    """
+    AsyncCrawlEngine for a ShardCrawler. Takes in the links other shards send, claims every visit from the ShardState,
+    and waits for more links (instead of stopping) when it has nothing left to visit, until the coordinator stops the crawl.
+    """
+
+    def __init__(self, crawler, max_hosts = 8, poll_interval = 0.05):
+        AsyncCrawlEngine.__init__(self, crawler, max_hosts)
+        self.poll_interval = poll_interval
+        self.inbox = crawler.inboxes[crawler.shard]
+
+    def has_work(self):
+        return bool(self.crawler.frontier or self.pending)
+
+    def claim(self, running):
+        if not self.has_work():
+            return False
+        return self.crawler.state.claim(self.crawler.shard)
+
+    def release(self):
+        self.crawler.state.release()
+
+    def poll(self):
+        batches = 0
+        while True:
+            try:
+                batch = self.inbox.get_nowait()
+            except queue.Empty:
+                break
+            Crawler.enqueue(self.crawler, batch)
+            batches += 1
+        if batches:
+            self.crawler.state.receive(self.crawler.shard, batches, self.has_work())
+
+    def finished(self):
+        return self.crawler.state.idle(self.crawler.shard, self.has_work())
+
+def runShard(address, authkey, shard):
+    """
+    Function to crawl one shard of a sharded crawl, until the coordinator stops it.
+    Used for the shard processes of ShardedCrawl, and for shards on other machines (--join).
+    Inputs: address ((str, int)), address of the coordinator's broker
+            authkey (bytes), key shared with the coordinator
+            shard (int), the shard to crawl
+    """
+    broker = ShardBroker(address = address, authkey = authkey)
+    broker.connect()
+    state = broker.state()
+    settings = state.settings()
+    inboxes = [broker.inbox(i) for i in range(settings['num_shards'])]
+    shard_crawler = ShardCrawler(shard, HashRing(settings['num_shards']), inboxes, broker.results(), state,
+                                 settings['num_to_visit'], settings['secured'], settings['no_goes'],
+                                 RulePolicy.from_dict(settings['policy']), settings['bloom_capacity'],
+                                 parseScorers(settings['scorers']) if settings['scorers'] else None)
+    shard_crawler.crawl_delay = settings['crawl_delay']
+    shard_crawler.max_links = settings['max_links']
+    shard_crawler.max_bytes = settings['max_bytes']
+    if settings['http_cache'] is not None:
+        shard_crawler.http_cache = ResponseCache(*settings['http_cache'])
+    if settings['terms_cache'] is not None:
+        shard_crawler.terms_cache = TermsCache(settings['terms_cache'])
+    try:
+        asyncio.run(ShardEngine(shard_crawler, settings['max_hosts']).run())
+    finally:
+        shard_crawler.close()
+        state.add_metrics(shard_crawler.metrics.snapshot())
+
+class ShardedCrawl():
+    """
+    Crawls with several processes (shards). The HashRing gives each host to one shard, so every shard has its own
+    frontier and politeness state, and parses its pages on its own core. Links to the hosts of another shard go to that
+    shard's inbox. The records of all shards are merged into `crawler` (the coordinator's Crawler), so its sites_dict,
+    store and exporters hold one network, as for a crawl in one process.
+
+    The inboxes, the results queue and the ShardState are served by a broker (a multiprocessing manager) on a TCP address.
+    local_shards of the shards are started here, the rest can join from other machines with runShard (--join).
+    The policy must be a RulePolicy: shards can't ask at the keyboard.
+    """
+
+    def __init__(self, crawler, num_shards, max_hosts = 8, address = ('127.0.0.1', 0), authkey = None, local_shards = None):
+        if not isinstance(crawler.policy, RulePolicy):
+            raise ValueError('A sharded crawl needs a RulePolicy (a policy file)')
+        self.crawler = crawler                                                  # Crawler the records of all shards are merged into
+        self.num_shards = num_shards
+        self.max_hosts = max_hosts                                              # Hosts crawled at the same time, by each shard
+        self.address = address                                                  # Address the broker listens on. Port 0 for any free port.
+        self.authkey = authkey if authkey is not None else os.urandom(16)      # Shards on other machines need to be given the same key
+        self.local_shards = num_shards if local_shards is None else local_shards  # Shards started here: 0 .. local_shards-1
+        self.ring = HashRing(num_shards)
+        self.state = ShardState(self.shard_settings(), crawler.metrics)
+        self.inboxes = [queue.Queue() for _ in range(num_shards)]
+        self.results = queue.Queue()
+        self.server = None
+        self.processes = []
+
+    def shard_settings(self):
+        """
+        Function to get the settings the shards are created with.
+        Output: settings (dict)
+        """
+        http_cache = self.crawler.http_cache                                    # The shards open the same file
+        return {'num_shards':self.num_shards,
+                'num_to_visit':self.crawler.num_to_visit,
+                'secured':self.crawler.secured,
+                'no_goes':self.crawler.no_goes,
+                'policy':self.crawler.policy.to_dict(),
+                'bloom_capacity':self.crawler.seen_capacity,
+                'scorers':','.join(scorer.to_spec() for scorer in self.crawler.scorers) if self.crawler.scorers is not None else None,
+                'crawl_delay':self.crawler.crawl_delay,
+                'max_links':self.crawler.max_links,
+                'max_bytes':self.crawler.max_bytes,
+                'http_cache':[http_cache.path, http_cache.max_bytes] if http_cache is not None else None,
+                'terms_cache':self.crawler.terms_cache.path,
+                'max_hosts':self.max_hosts}
+
+    def serve(self):
+        """
+        Function to start the broker in a background thread.
+        Output: address ((str, int)), the address it listens on.
+        """
+        class Broker(BaseManager):
+            pass
+        Broker.register('state', callable = lambda: self.state)
+        Broker.register('inbox', callable = lambda shard: self.inboxes[shard])
+        Broker.register('results', callable = lambda: self.results)
+        self.server = Broker(address = self.address, authkey = self.authkey).get_server()
+        threading.Thread(target = self.server.serve_forever, name = 'ShardedCrawl broker', daemon = True).start()
+        self.address = self.server.address
+        return self.address
+
+    def run(self, check_interval = 0.1):
+        """
+        Function to crawl with all shards until the crawl is finished, merging their records into the crawler as they arrive.
+        Input: check_interval (float), seconds between checks of whether the crawl is finished
+        Output: sites_dict of the crawler.
+        """
+        if self.server is None:
+            self.serve()
+        # 1. Seeds: every site in the crawler's frontier goes to its shard.
+        seeds = {}
+        for url in self.crawler.frontier:
+            seeds.setdefault(self.ring.url_owner(url), []).append(url)
+        self.state.send(len(seeds))
+        for shard, batch in seeds.items():
+            self.inboxes[shard].put(batch)
+
+        # 2. Start the shards, and merge their records until the crawl is finished.
+        for shard in range(self.local_shards):
+            process = Process(target = runShard, args = (self.address, self.authkey, shard), name = 'shard %d' % shard, daemon = True)
+            process.start()
+            self.processes.append(process)
+        try:
+            while True:
+                try:
+                    site_record = self.results.get(timeout = check_interval)
+                except queue.Empty:
+                    if self.state.check():
+                        break
+                    for process in self.processes:
+                        if process.exitcode not in (None, 0):
+                            raise RuntimeError('%s stopped with exit code %d' % (process.name, process.exitcode))
+                    continue
+                self.merge(site_record)
+            while not self.results.empty():
+                self.merge(self.results.get())
+        finally:
+            self.state.stop()
+            for process in self.processes:
+                process.join(10)
+                if process.is_alive():
+                    process.terminate()
+            self.server.stop_event.set()
+        return self.crawler.sites_dict
+
+    def merge(self, site_record):
+        """
+        Function to add a record from a shard to the crawler (and so to its store and exporters).
+        Input: site_record (dict)
+        """
+        self.crawler.record(site_record['url'], site_record, None)
+        if site_record['links'] is not None:
+            self.crawler.counter_total += 1
@@ -0,0 +1,130 @@
+# Crawl state on disk.
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+class CrawlStore():
+    """
+    Checkpoints the crawl state to an SQLite database, so that a crawl can be resumed after a crash.
+    Every site that is queued and every attempt that is recorded is put on a write-ahead queue. A background thread
+    writes the queue to the database in batches, so the crawl itself never waits for the disk.
+    A site that was queued but has no record (eg. it was being visited during the crash) is queued again on resume.
+    Writes are committed in the order they are logged, so the Crawler logs the links of a site before its record.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS queued (seq INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT UNIQUE);
+        CREATE TABLE IF NOT EXISTS records (attempt INTEGER PRIMARY KEY, url TEXT, record TEXT);
+    """
+
+    def __init__(self, path, batch_size = 500, flush_interval = 1.0):
+        self.path = path                                                        # Path of the SQLite database
+        self.batch_size = batch_size                                            # Most writes per transaction
+        self.flush_interval = flush_interval                                    # Longest time (s) a write waits in the queue before it is committed
+        self.pending = queue.Queue()                                            # Write-ahead queue: ('queued', url) or ('record', attempt, site_record). None stops the writer.
+
+        connection = sqlite3.connect(self.path)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(self.SCHEMA)
+        connection.close()
+
+        self.writer = threading.Thread(target = self.write_loop, name = 'CrawlStore writer', daemon = True)
+        self.writer.start()
+
+    def save_settings(self, settings):
+        """
+        Function to store the settings of the crawl (seed, number of sites, etc.), so --resume doesn't have to ask for them.
+        Input: settings (dict), values must be JSON serialisable.
+        """
+        connection = sqlite3.connect(self.path)
+        with connection:
+            connection.executemany('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)',
+                                   [(key, json.dumps(value)) for key, value in settings.items()])
+        connection.close()
+
+    def load_settings(self):
+        """
+        Function to read the settings of the crawl.
+        Output: settings (dict)
+        """
+        connection = sqlite3.connect(self.path)
+        settings = {key: json.loads(value) for key, value in connection.execute('SELECT key, value FROM settings')}
+        connection.close()
+        return settings
+
+    def load_state(self):
+        """
+        Function to read the checkpointed crawl state.
+        Outputs: queued (list of str), every site that was queued, in the order it was queued.
+                 records (list of (int, dict)), every attempt and its entry for sites_dict, in order.
+        """
+        connection = sqlite3.connect(self.path)
+        queued = [url for (url,) in connection.execute('SELECT url FROM queued ORDER BY seq')]
+        records = [(attempt, json.loads(record)) for attempt, record in connection.execute('SELECT attempt, record FROM records ORDER BY attempt')]
+        connection.close()
+        return queued, records
+
+    def log_queued(self, url):
+        """
+        Function to checkpoint a site that has been added to the frontier.
+        Input: url (str), canonical
+        """
+        self.pending.put(('queued', url))
+
+    def log_record(self, attempt, site_record):
+        """
+        Function to checkpoint an attempt. The record is only turned into JSON by the writer thread.
+        Inputs: attempt (int), the key in sites_dict
+                site_record (dict), the entry in sites_dict
+        """
+        self.pending.put(('record', attempt, site_record))
+
+    def write_loop(self):
+        """
+        Function run by the writer thread. Takes writes off the queue and commits them in batches.
+        """
+        connection = sqlite3.connect(self.path)
+        stopping = False
+        while not stopping:
+            # 1. Wait for a write, then collect more for up to flush_interval seconds.
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout = timeout))
+                except queue.Empty:
+                    break
+
+            # 2. Write them in one transaction.
+            with connection:
+                for write in batch:
+                    if write is None:
+                        stopping = True
+                    elif write[0] == 'queued':
+                        connection.execute('INSERT OR IGNORE INTO queued (url) VALUES (?)', (write[1],))
+                    else:
+                        connection.execute('INSERT OR REPLACE INTO records (attempt, url, record) VALUES (?, ?, ?)',
+                                           (write[1], write[2]['url'], json.dumps(write[2])))
+            for write in batch:
+                self.pending.task_done()
+        connection.close()
+
+    def flush(self):
+        """
+        Function to wait until everything queued so far has been written.
+        """
+        self.pending.join()
+
+    def close(self):
+        """
+        Function to write everything that is left and stop the writer thread.
+        """
+        self.pending.put(None)
+        self.writer.join()
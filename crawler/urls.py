@@ -0,0 +1,222 @@
+# URL canonicalisation, resolution and filtering.
+
+import re
+from functools import lru_cache
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+def splitRootUrl(url):
+    """
+    Function to split a URL into the root of the site and the extension (the rest of it).
+    Inputs: url (str), eg. 'https://www.abcd.com/1/2?x=3'
+    Output: root_url (str), eg. 'https://www.abcd.com'. Scheme and host are lower-cased, so this can be used as a key.
+            tExtension (str), eg. '/1/2?x=3'. Always starts with '/'.
+    """
+    site_pieces = url.split('//',1)                                             # ['https:','www.abcd.com/1/2?x=3']
+    second_list = site_pieces[1].split('/',1)                                   # ['www.abcd.com','1/2?x=3']
+    root_url = (site_pieces[0] + '//' + second_list[0]).lower()                 # 'https://www.abcd.com'
+    if len(second_list) > 1:
+        tExtension = '/' + second_list[1]
+    else:                                                                       # eg. 'https://www.abcd.com', nothing after the host.
+        tExtension = '/'
+    return root_url, tExtension
+
+def hostOfUrl(root_url, with_port = False):
+    """
+    Function to get the host name out of a root url.
+    Inputs: root_url (str), eg. 'https://www.abcd.com:8080'
+            with_port (Bool), keep the port, eg. 'www.abcd.com:8080'. Different ports are different servers for politeness.
+    Output: host (str), eg. 'www.abcd.com', lower-cased and without the port.
+    """
+    host = root_url.split('//', 1)[-1].split('/', 1)[0]
+    host = host.rsplit('@', 1)[-1].lower()
+    if with_port:
+        return host
+    return host.split(':', 1)[0]
+
+# Query parameters that only track where a click came from. They are removed, so the same page isn't queued once per campaign.
+TRACKING_PARAMS = frozenset(['gclid', 'dclid', 'gbraid', 'wbraid', 'fbclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+                             '_ga', '_gl', '_hsenc', '_hsmi', 'mkt_tok', 'ref_src', 'spm'])
+SCHEME_RE = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]*:')                            # A link that starts with a scheme is already absolute
+PERCENT_RE = re.compile(r'%([0-9a-fA-F]{2})')
+UNRESERVED = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~')
+DEFAULT_PORTS = {'http':'80', 'https':'443'}
+
+def normalisePercent(match):
+    char = chr(int(match.group(1), 16))
+    if char in UNRESERVED:                                                      # '%7E' and '~' are the same URL
+        return char
+    return '%' + match.group(1).upper()                                         # '%2f' and '%2F' are the same URL
+
+def removeDotSegments(path):
+    """
+    Function to remove '.' and '..' segments from a path (RFC 3986, 5.2.4).
+    Input: path (str), eg. '/a/b/../c/./d'
+    Output: (str), eg. '/a/c/d'
+    """
+    if '.' not in path:                                                         # Nearly every path
+        return path
+    segments = path.split('/')
+    output = []
+    for segment in segments:
+        if segment == '..':
+            if len(output) > 1 or (output and output[0] != ''):                 # Never remove the '' that makes the path absolute
+                output.pop()
+        elif segment != '.':
+            output.append(segment)
+    if segments[-1] in ('.', '..'):                                             # '/a/b/..' is the directory '/a/'
+        output.append('')
+    return '/'.join(output)
+
+@lru_cache(maxsize = 65536)
+def canonicaliseUrl(url):
+    """
+    Function to put an absolute URL into its canonical form, so the same site isn't queued under different spellings.
+    Lower-cases the scheme and host, removes default ports, the fragment, '.'/'..' segments and tracking parameters,
+    normalises percent-escapes and gives an empty path as '/'. URLs that aren't http(s) are only stripped.
+    Memoised, since the same links turn up on page after page.
+    Input: url (str)
+    Output: (str)
+    """
+    url = url.strip()
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:                                             # eg. mailto:, javascript:
+        return url
+
+    # Host: lower case, no trailing '.', no default port.
+    userinfo, at, hostport = parts.netloc.rpartition('@')
+    host, colon, port = hostport.lower().partition(':')
+    if host.startswith('['):                                                    # IPv6, eg. '[::1]:8080'
+        host, _, port = hostport.lower().partition(']')
+        host = host + ']'
+        port = port.lstrip(':')
+    host = host.rstrip('.')
+    if port and port != DEFAULT_PORTS[scheme]:
+        host = host + ':' + port
+    netloc = userinfo + at + host
+
+    path = removeDotSegments(PERCENT_RE.sub(normalisePercent, parts.path)) or '/'
+
+    query = parts.query
+    if query:
+        params = []
+        for param in query.split('&'):
+            name = param.split('=', 1)[0].lower()
+            if param and name not in TRACKING_PARAMS and not name.startswith('utm_'):
+                params.append(PERCENT_RE.sub(normalisePercent, param))
+        query = '&'.join(params)
+
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+@lru_cache(maxsize = 4096)
+def baseOrigin(base):
+    """
+    Function to get the scheme and origin of a base URL. Memoised, because every link on a page has the same base.
+    Input: base (str), eg. 'https://www.abcd.com/a/b.html'
+    Output: scheme (str), eg. 'https'
+            origin (str), eg. 'https://www.abcd.com'
+    """
+    parts = urlsplit(base)
+    return parts.scheme, parts.scheme + '://' + parts.netloc
+
+def resolveUrl(base, href):
+    """
+    Function to turn a link on a page into a canonical absolute URL (RFC 3986 resolution, then canonicaliseUrl).
+    Links that are absolute, or relative to the host ('//...' or '/...'), only depend on the host of the page,
+    so they are resolved without parsing the whole base URL and share cache entries across all pages of the host.
+    Inputs: base (str), the URL of the page (or its <base href>)
+            href (str), the link, eg. '../c.html', '/d', '//cdn.abcd.com/e', 'https://x.org'
+    Output: (str), the canonical absolute URL. None if the link is malformed (eg. 'http://[bad/').
+    """
+    href = href.strip()
+    try:
+        if SCHEME_RE.match(href):
+            return canonicaliseUrl(href)
+        scheme, origin = baseOrigin(base)
+        if href.startswith('//'):
+            return canonicaliseUrl(scheme + ':' + href)
+        if href.startswith('/'):
+            return canonicaliseUrl(origin + href)
+        return canonicaliseUrl(urljoin(base, href))                             # Relative to the path of the page, eg. 'c.html', '../c', '?q=1', '#top'
+    except ValueError:                                                          # urlsplit: eg. 'Invalid IPv6 URL'
+        return None
+
+def resolveLinks(page_url, hrefs, base_href = None):
+    """
+    Function to resolve all the links of a page at once.
+    Inputs: page_url (str), the URL of the page
+            hrefs (iterable of str), the links on the page
+            base_href (str), the href of the page's <base> tag, if it has one
+    Output: (list of str), canonical absolute URLs, in the same order. Malformed links are left out.
+    """
+    base = page_url
+    if base_href:
+        try:
+            base = urljoin(page_url, base_href.strip())
+        except ValueError:                                                      # A malformed <base href> is ignored
+            pass
+    links = []
+    for href in hrefs:
+        url = resolveUrl(base, href)
+        if url is not None:
+            links.append(url)
+    return links
+
+class UrlFilter():
+    """
+    Decides whether a site may be visited at all: its scheme must be one we crawl, and it must not be a no-go site.
+    Built once from the no-go list, so each URL costs a few dictionary lookups however long the list is.
+    No-go entries can be:
+        'abcd.com'                      - the domain and all of its subdomains
+        'https://www.abcd.com'          - that host (with that port), all of its sites
+        'https://www.abcd.com/private'  - the sites of that host whose path starts with '/private'
+    Hosts are compared in canonical form (see canonicaliseUrl), so 'https://WWW.abcd.com:443' is the same as 'https://www.abcd.com'.
+    """
+
+    def __init__(self, no_goes = (), secured = True):
+        self.schemes = frozenset(['http', 'https'] if secured else ['https'])   # secured: True if sites that are NOT secured should be visited
+        self.domains = set()                                                    # No-go domains, with all of their subdomains
+        self.prefixes = {}                                                      # host[:port]: (lengths of its no-go path prefixes, set of them)
+        paths = {}
+        for no_go in no_goes:
+            no_go = no_go.strip()
+            if not no_go:                                                       # An empty entry (eg. no answer at the prompt) excludes nothing
+                continue
+            if '//' not in no_go:
+                self.domains.add(no_go.strip('.').lower())
+                continue
+            scheme, netloc, path, query, _ = urlsplit(canonicaliseUrl(no_go))
+            if query:
+                path = path + '?' + query
+            paths.setdefault(netloc.rpartition('@')[2], set()).add(path or '/')
+        for host, host_paths in paths.items():
+            self.prefixes[host] = (sorted(set(len(path) for path in host_paths)), host_paths)
+
+    def reason(self, url):
+        """
+        Function to check a site.
+        Input: url (str)
+        Output: None if it may be visited. Otherwise 'scheme' (eg. mailto:, ftp:, or http: when only secured sites are
+                crawled), 'nogo' or 'invalid' (a malformed URL, eg. a seed like 'http://[bad/').
+        """
+        try:
+            url = canonicaliseUrl(url)                                          # Memoised: links are canonical already
+        except ValueError:
+            return 'invalid'
+        scheme, colon, rest = url.partition(':')
+        if not colon or scheme.lower() not in self.schemes or not rest.startswith('//'):
+            return 'scheme'
+        netloc, slash, path = rest[2:].partition('/')
+        host = netloc.rpartition('@')[2]
+        if host in self.prefixes:
+            path = '/' + path
+            lengths, host_paths = self.prefixes[host]
+            for length in lengths:                                              # One lookup per distinct prefix length, not per prefix
+                if path[:length] in host_paths:
+                    return 'nogo'
+        if self.domains:
+            labels = hostOfUrl(host).split('.')
+            for i in range(len(labels)):                                        # 'a.b.abcd.com', then 'b.abcd.com', 'abcd.com', 'com'
+                if '.'.join(labels[i:]) in self.domains:
+                    return 'nogo'
+        return None
@@ -0,0 +1,93 @@
+# Tests for crawler/frontier.py
+
+import unittest
+
+from crawler.frontier import DepthScorer, Frontier, HostScorer, InLinkScorer, NoveltyScorer, PriorityFrontier, parseScorers
+
+def popAll(frontier):
+    """
+    Function to take every site from a frontier, starting each one as the crawl does.
+    Input: frontier (Frontier)
+    Output: (list of str), in the order they were taken
+    """
+    taken = []
+    while len(frontier):
+        url = frontier.pop()
+        frontier.started(url)
+        taken.append(url)
+    return taken
+
+class PriorityFrontierTest(unittest.TestCase):
+
+    def test_no_scorers_is_first_in_first_out(self):
+        urls = ['https://a.com/1', 'https://b.com/1', 'https://a.com/2']
+        frontier = PriorityFrontier()
+        plain = Frontier()
+        for url in urls:
+            frontier.push(url)
+            plain.push(url)
+        self.assertEqual(popAll(frontier), urls)
+        self.assertEqual(popAll(plain), urls)
+
+    def test_repeats_not_queued(self):
+        frontier = PriorityFrontier()
+        self.assertEqual(frontier.push('https://A.com:443/x#y'), 'https://a.com/x')
+        self.assertIsNone(frontier.push('https://a.com/x'))
+        frontier.pop()
+        self.assertIsNone(frontier.push('https://a.com/x'))                     # Taken already
+        self.assertEqual(len(frontier), 0)
+
+    def test_depth(self):
+        frontier = PriorityFrontier(scorers = [DepthScorer()])
+        frontier.push('https://a.com/')
+        self.assertEqual(frontier.pop(), 'https://a.com/')
+        frontier.push('https://a.com/deep', 'https://a.com/')
+        frontier.push('https://b.com/')
+        self.assertEqual(popAll(frontier), ['https://b.com/', 'https://a.com/deep'])
+
+    def test_in_links(self):
+        frontier = PriorityFrontier(scorers = [InLinkScorer()])
+        for source in ('https://s.com/1', 'https://s.com/2'):
+            frontier.push('https://a.com/once', source)
+        frontier.push('https://b.com/twice', 'https://s.com/1')
+        frontier.push('https://b.com/twice', 'https://s.com/2')
+        frontier.push('https://b.com/twice', 'https://s.com/3')
+        self.assertEqual(frontier.pop(), 'https://b.com/twice')
+
+    def test_hosts_take_turns(self):
+        frontier = PriorityFrontier(scorers = [HostScorer()])
+        for url in ('https://a.com/1', 'https://a.com/2', 'https://a.com/3', 'https://b.com/1', 'https://b.com/2'):
+            frontier.push(url)
+        self.assertEqual(popAll(frontier), ['https://a.com/1', 'https://b.com/1', 'https://a.com/2', 'https://b.com/2', 'https://a.com/3'])
+
+    def test_novelty(self):
+        frontier = PriorityFrontier(scorers = [NoveltyScorer()])
+        for url in ('https://a.com/1', 'https://a.com/2', 'https://b.com/1'):
+            frontier.push(url)
+        self.assertEqual(popAll(frontier), ['https://a.com/1', 'https://b.com/1', 'https://a.com/2'])
+
+    def test_busy_hosts_skipped(self):
+        frontier = PriorityFrontier()
+        for url in ('https://a.com/1', 'https://a.com/2', 'https://b.com/1'):
+            frontier.push(url)
+        self.assertEqual(frontier.pop(busy = {'a.com'}), 'https://b.com/1')
+        self.assertIsNone(frontier.pop(busy = {'a.com'}))                       # Only busy hosts left
+        self.assertEqual(len(frontier), 2)                                      # Their sites stay queued
+        self.assertEqual(frontier.pop(), 'https://a.com/1')
+
+    def test_empty(self):
+        with self.assertRaises(IndexError):
+            PriorityFrontier().pop()
+
+class ParseScorersTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        scorers = parseScorers('depth,hosts:2:50,inlinks:0.5')
+        self.assertEqual([scorer.to_spec() for scorer in scorers], ['depth:1.0', 'hosts:2.0:50.0', 'inlinks:0.5'])
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            parseScorers('depth,pagerank')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+# Tests for crawler/politeness.py
+
+import unittest
+from datetime import datetime, timezone
+
+from crawler.politeness import RateController, retryAfterSeconds
+
+NOW = datetime(2015, 10, 21, 7, 28, 0, tzinfo = timezone.utc)
+
+class RetryAfterTest(unittest.TestCase):
+
+    def test_delta_seconds(self):
+        self.assertEqual(retryAfterSeconds('120'), 120.0)
+        self.assertEqual(retryAfterSeconds(' 0 '), 0.0)
+        self.assertEqual(retryAfterSeconds('-5'), 0.0)
+
+    def test_gmt_date(self):
+        self.assertEqual(retryAfterSeconds('Wed, 21 Oct 2015 07:30:00 GMT', NOW), 120.0)
+        self.assertEqual(retryAfterSeconds('Wed, 21 Oct 2015 07:00:00 GMT', NOW), 0.0)
+
+    def test_minus_zero_zone(self):
+        # parsedate_to_datetime gives a naive datetime for '-0000'
+        self.assertEqual(retryAfterSeconds('Wed, 21 Oct 2015 07:29:00 -0000', NOW), 60.0)
+        self.assertEqual(retryAfterSeconds('Wed, 21 Oct 2015 07:29:00 -0000', NOW.replace(tzinfo = None)), 60.0)
+
+    def test_unreadable(self):
+        for value in (None, '', 'soon', 'nan', 'inf'):
+            self.assertIsNone(retryAfterSeconds(value))
+
+    def test_on_response_with_minus_zero_date(self):
+        rates = RateController()
+        rates.on_response('a.com', 503, 0.1, 'Mon, 01 Jan 1990 00:00:00 -0000')    # Must not raise
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+# Tests for crawler/robots.py
+
+import unittest
+from unittest import mock
+
+from crawler import robots
+from crawler.robots import RobotsCache, RobotsRules, cacheTtlFromHeaders, parseRobots
+
+class RobotsRulesTest(unittest.TestCase):
+
+    def test_longest_match_wins(self):
+        rules = RobotsRules(200, disallow_list = ['/a'], allow_list = ['/a/b'])
+        self.assertFalse(rules.is_allowed('/a/c'))
+        self.assertTrue(rules.is_allowed('/a/b/c'))
+        self.assertTrue(rules.is_allowed('/x'))                                 # No rule matches
+
+    def test_allow_wins_a_tie(self):
+        rules = RobotsRules(200, disallow_list = ['/page'], allow_list = ['/page'])
+        self.assertTrue(rules.is_allowed('/page'))
+
+    def test_wildcards(self):
+        rules = RobotsRules(200, disallow_list = ['/*.pdf$', '/private*'], allow_list = ['/private/open*'])
+        self.assertFalse(rules.is_allowed('/docs/a.pdf'))
+        self.assertTrue(rules.is_allowed('/docs/a.pdf?x=1'))                    # '$' anchors the end
+        self.assertFalse(rules.is_allowed('/private/x'))
+        self.assertTrue(rules.is_allowed('/private/open/x'))
+
+    def test_wildcard_rule_longer_than_plain(self):
+        rules = RobotsRules(200, disallow_list = ['/shop'], allow_list = ['/shop/*/item'])
+        self.assertTrue(rules.is_allowed('/shop/x/item'))
+        self.assertFalse(rules.is_allowed('/shop/x/other'))
+
+    def test_empty_disallow(self):
+        self.assertTrue(RobotsRules(200, disallow_list = ['']).is_allowed('/'))
+
+    def test_status(self):
+        rules = RobotsRules(200, disallow_list = ['/'])
+        for status in (400, 401, 403, 404, 410):                                # No robots file: everything is allowed
+            self.assertTrue(RobotsRules(status).is_allowed('/a'), status)
+        for status in (429, 500, 503, 301):                                     # Unreachable: nothing is
+            self.assertFalse(RobotsRules(status).is_allowed('/a'), status)
+        self.assertFalse(rules.is_allowed('/a'))
+
+    def test_refused(self):
+        rules = RobotsRules(200)
+        rules.refused = True
+        self.assertFalse(rules.is_allowed('/a'))
+
+    def test_allowed_paths(self):
+        rules = RobotsRules(200, disallow_list = ['/a'], allow_list = ['/a/b'])
+        paths = ['/a', '/a/b', '/c']
+        self.assertEqual(rules.allowed_paths(paths), [rules.is_allowed(path) for path in paths])
+        self.assertEqual(RobotsRules(404).allowed_paths(paths), [True, True, True])
+        self.assertEqual(RobotsRules(503).allowed_paths(paths), [False, False, False])
+
+class ParseRobotsTest(unittest.TestCase):
+
+    def test_groups_ignore_blank_lines(self):
+        rules = parseRobots('User-agent: *\n\nDisallow: /a\n', 200)
+        self.assertFalse(rules.is_allowed('/a'))
+
+    def test_user_agent_after_rules_starts_a_group(self):
+        text = ('User-agent: *\n'
+                'Disallow: /a\n'
+                'User-agent: otherbot\n'
+                'Disallow: /b\n')
+        rules = parseRobots(text, 200)
+        self.assertFalse(rules.is_allowed('/a'))
+        self.assertTrue(rules.is_allowed('/b'))
+
+    def test_several_user_agents_share_a_group(self):
+        text = ('User-agent: otherbot\n'
+                'User-agent: *\n'
+                'Disallow: /a\n')
+        self.assertFalse(parseRobots(text, 200).is_allowed('/a'))
+
+    def test_own_group_used_instead_of_star(self):
+        text = ('User-agent: *\n'
+                'Disallow: /\n'
+                '\n'
+                'User-agent: CustomCrawler\n'
+                'Disallow: /private\n'
+                'Crawl-delay: 2\n')
+        rules = parseRobots(text, 200)
+        self.assertTrue(rules.is_allowed('/public'))
+        self.assertFalse(rules.is_allowed('/private'))
+        self.assertEqual(rules.crawl_delay, 2.0)
+
+    def test_comments(self):
+        text = ('# Please be nice\n'
+                'User-agent: * # everyone\n'
+                'Disallow: /a # not this\n')
+        rules = parseRobots(text, 200)
+        self.assertFalse(rules.is_allowed('/a'))
+        self.assertTrue(rules.is_allowed('/b'))
+        self.assertIn('Please be nice', rules.comments)
+
+class CacheTtlTest(unittest.TestCase):
+
+    def ttl(self, headers):
+        return cacheTtlFromHeaders(headers, 100)
+
+    def test_no_headers(self):
+        self.assertEqual(self.ttl(None), 100)
+        self.assertEqual(self.ttl({}), 100)
+
+    def test_max_age(self):
+        self.assertEqual(self.ttl({'Cache-Control':'public, max-age=60'}), 60)
+        self.assertEqual(self.ttl({'Cache-Control':'max-age=60, s-maxage=30'}), 30)
+        self.assertEqual(self.ttl({'Cache-Control':'max-age="60"'}), 60)
+
+    def test_directives_without_a_value(self):
+        self.assertEqual(self.ttl({'Cache-Control':'s-maxage'}), 100)
+        self.assertEqual(self.ttl({'Cache-Control':'s-maxage, max-age=60'}), 60)
+        self.assertEqual(self.ttl({'Cache-Control':'max-age=soon'}), 100)
+
+    def test_no_store(self):
+        self.assertEqual(self.ttl({'Cache-Control':'no-store'}), 0)
+        self.assertEqual(cacheTtlFromHeaders({'Cache-Control':'no-cache'}, 100, min_ttl = 60), 60)
+
+    def test_expires(self):
+        headers = {'Date':'Wed, 21 Oct 2015 07:28:00 GMT', 'Expires':'Wed, 21 Oct 2015 07:30:00 GMT'}
+        self.assertEqual(self.ttl(headers), 120)
+        self.assertEqual(self.ttl({'Expires':'0'}), 0)
+
+    def test_bounds(self):
+        self.assertEqual(cacheTtlFromHeaders({'Cache-Control':'max-age=999999'}, 100, max_ttl = 86400), 86400)
+
+class FakeClock():
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+class RobotsCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(robots, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_expiry(self):
+        cache = RobotsCache(default_ttl = 600, min_ttl = 60, error_ttl = 30)
+        cache.put('https://a.test', RobotsRules(200), {'Cache-Control':'max-age=120'})
+        cache.put('https://b.test', RobotsRules(404))
+        cache.put('https://c.test', RobotsRules(503))
+        cache.put('https://d.test', RobotsRules(429))
+        self.clock.now += 31
+        self.assertIsNotNone(cache.get('https://a.test'))
+        self.assertIsNotNone(cache.get('https://b.test'))
+        self.assertIsNone(cache.get('https://c.test'))                          # Errors are retried sooner
+        self.assertIsNone(cache.get('https://d.test'))
+        self.clock.now += 100
+        self.assertIsNone(cache.get('https://a.test'))
+        self.assertIsNotNone(cache.get('https://b.test'))
+
+    def test_least_recently_used_host_dropped(self):
+        cache = RobotsCache(max_hosts = 2)
+        cache.put('https://a.test', RobotsRules(200))
+        cache.put('https://b.test', RobotsRules(200))
+        cache.get('https://a.test')
+        cache.put('https://c.test', RobotsRules(200))
+        self.assertIn('https://a.test', cache)
+        self.assertNotIn('https://b.test', cache)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+# Tests for crawler/sessions.py
+
+import socket
+import unittest
+from unittest import mock
+
+from crawler import sessions
+from crawler.sessions import DnsCache
+
+class FakeClock():
+    """
+    Stands in for the time module in crawler.sessions, so entries expire when the test says.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+class StubResolver():
+    """
+    Resolver for a DnsCache: the hosts in addresses resolve, the others don't exist. Counts the lookups.
+    """
+
+    def __init__(self, addresses, ttl = None):
+        self.addresses = addresses                                              # host: list of addresses
+        self.ttl = ttl
+        self.lookups = []
+
+    def __call__(self, host):
+        self.lookups.append(host)
+        if host not in self.addresses:
+            raise socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+        return self.addresses[host], self.ttl
+
+class DnsCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(sessions, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_cache(self, resolver, **kwargs):
+        dns = DnsCache(resolver, workers = 1, **kwargs)
+        self.addCleanup(dns.close)
+        return dns
+
+    def test_cached_until_ttl(self):
+        resolver = StubResolver({'a.test':['10.0.0.1', '10.0.0.2']})
+        dns = self.make_cache(resolver, ttl = 300)
+        self.assertEqual(dns.resolve('a.test'), ['10.0.0.1', '10.0.0.2'])
+        self.clock.now += 299
+        self.assertEqual(dns.resolve('A.test.'), ['10.0.0.1', '10.0.0.2'])     # Same host, cached
+        self.assertEqual(resolver.lookups, ['a.test'])
+        self.clock.now += 2
+        dns.resolve('a.test')
+        self.assertEqual(resolver.lookups, ['a.test', 'a.test'])
+
+    def test_ttl_from_resolver(self):
+        resolver = StubResolver({'a.test':['10.0.0.1']}, ttl = 5)
+        dns = self.make_cache(resolver, ttl = 300)
+        dns.resolve('a.test')
+        self.clock.now += 6
+        dns.resolve('a.test')
+        self.assertEqual(len(resolver.lookups), 2)
+
+    def test_negative_caching(self):
+        resolver = StubResolver({})
+        dns = self.make_cache(resolver, negative_ttl = 60)
+        with self.assertRaises(socket.gaierror):
+            dns.resolve('missing.test')
+        self.clock.now += 59
+        with self.assertRaises(socket.gaierror):
+            dns.resolve('missing.test')
+        self.assertEqual(resolver.lookups, ['missing.test'])
+        self.clock.now += 2
+        with self.assertRaises(socket.gaierror):
+            dns.resolve('missing.test')
+        self.assertEqual(len(resolver.lookups), 2)
+
+    def test_no_addresses_is_a_failure(self):
+        dns = self.make_cache(StubResolver({'empty.test':[]}))
+        with self.assertRaises(socket.gaierror):
+            dns.resolve('empty.test')
+
+    def test_addresses_are_not_looked_up(self):
+        resolver = StubResolver({})
+        dns = self.make_cache(resolver)
+        self.assertEqual(dns.resolve('127.0.0.1'), ['127.0.0.1'])
+        dns.prefetch(['10.0.0.1', '[::1]'])
+        self.assertEqual(resolver.lookups, [])
+
+    def test_prefetch(self):
+        resolver = StubResolver({'a.test':['10.0.0.1']})
+        dns = self.make_cache(resolver)
+        dns.prefetch(['a.test', 'A.TEST'])
+        self.assertEqual(dns.resolve('a.test'), ['10.0.0.1'])
+        self.assertEqual(resolver.lookups, ['a.test'])
+
+    def test_least_recently_used_host_dropped(self):
+        resolver = StubResolver({'a.test':['10.0.0.1'], 'b.test':['10.0.0.2'], 'c.test':['10.0.0.3']})
+        dns = self.make_cache(resolver, max_hosts = 2)
+        for host in ('a.test', 'b.test', 'a.test', 'c.test', 'a.test', 'b.test'):
+            dns.resolve(host)
+        self.assertEqual(resolver.lookups, ['a.test', 'b.test', 'c.test', 'b.test'])
+
+if __name__ == '__main__':
+    unittest.main()
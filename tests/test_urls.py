@@ -0,0 +1,73 @@
+# Tests for crawler/urls.py
+
+import unittest
+
+from crawler.urls import UrlFilter, canonicaliseUrl, resolveLinks
+
+class CanonicaliseUrlTest(unittest.TestCase):
+
+    def test_scheme_host_and_port(self):
+        self.assertEqual(canonicaliseUrl('HTTP://WWW.Example.COM:80/A'), 'http://www.example.com/A')
+        self.assertEqual(canonicaliseUrl('https://example.com:443/'), 'https://example.com/')
+        self.assertEqual(canonicaliseUrl('https://example.com:8443/'), 'https://example.com:8443/')
+        self.assertEqual(canonicaliseUrl('https://example.com./p'), 'https://example.com/p')
+        self.assertEqual(canonicaliseUrl('https://[::1]:443/x'), 'https://[::1]/x')
+
+    def test_path(self):
+        self.assertEqual(canonicaliseUrl('https://example.com'), 'https://example.com/')
+        self.assertEqual(canonicaliseUrl('https://example.com/a/./b/../c'), 'https://example.com/a/c')
+
+    def test_percent_escapes(self):
+        self.assertEqual(canonicaliseUrl('https://example.com/%7euser/%2f'), 'https://example.com/~user/%2F')
+
+    def test_fragment_and_tracking_parameters(self):
+        self.assertEqual(canonicaliseUrl('https://example.com/p?utm_source=x&b=2#top'), 'https://example.com/p?b=2')
+        self.assertEqual(canonicaliseUrl('https://example.com/p?b=1&a=2'), 'https://example.com/p?b=1&a=2')    # Order kept
+
+    def test_other_schemes_only_stripped(self):
+        self.assertEqual(canonicaliseUrl(' mailto:Someone@Example.com '), 'mailto:Someone@Example.com')
+
+    def test_same_site(self):
+        self.assertEqual(canonicaliseUrl('https://EXAMPLE.com:443/a/../b#x'), canonicaliseUrl('https://example.com/b'))
+
+class ResolveLinksTest(unittest.TestCase):
+
+    def test_malformed_links_dropped(self):
+        links = resolveLinks('https://example.com/a/', ['b', 'http://[bad/', '../c'])
+        self.assertEqual(links, ['https://example.com/a/b', 'https://example.com/c'])
+
+class UrlFilterTest(unittest.TestCase):
+
+    def test_schemes(self):
+        everything = UrlFilter(secured = True)
+        self.assertIsNone(everything.reason('http://a.com/'))
+        self.assertIsNone(everything.reason('https://a.com/'))
+        self.assertEqual(everything.reason('mailto:x@a.com'), 'scheme')
+        self.assertEqual(everything.reason('ftp://a.com/'), 'scheme')
+        secured_only = UrlFilter(secured = False)
+        self.assertEqual(secured_only.reason('http://a.com/'), 'scheme')
+        self.assertIsNone(secured_only.reason('https://a.com/'))
+
+    def test_domains(self):
+        url_filter = UrlFilter(['abcd.com'])
+        self.assertEqual(url_filter.reason('https://abcd.com/'), 'nogo')
+        self.assertEqual(url_filter.reason('https://www.sub.ABCD.com/a'), 'nogo')
+        self.assertIsNone(url_filter.reason('https://notabcd.com/'))
+
+    def test_hosts_and_paths(self):
+        url_filter = UrlFilter(['https://WWW.x.com:443/private', 'https://y.com:8443'])
+        self.assertEqual(url_filter.reason('https://www.x.com/private/1'), 'nogo')
+        self.assertEqual(url_filter.reason('https://www.x.com/private'), 'nogo')
+        self.assertIsNone(url_filter.reason('https://www.x.com/public'))
+        self.assertIsNone(url_filter.reason('http://www.x.com/public'))
+        self.assertEqual(url_filter.reason('https://y.com:8443/a'), 'nogo')
+        self.assertIsNone(url_filter.reason('https://y.com/a'))                 # Another port, another server
+
+    def test_empty_entries(self):
+        self.assertIsNone(UrlFilter(['', ' ']).reason('https://a.com/'))
+
+    def test_invalid(self):
+        self.assertEqual(UrlFilter().reason('http://[bad/'), 'invalid')
+
+if __name__ == '__main__':
+    unittest.main()